@@ -2,11 +2,11 @@
 
 
 a = Analysis(
-    ['main.py'],
+    ['servidor.py'],
     pathex=[],
     binaries=[],
     datas=[('templates', 'templates'), ('static', 'static')],
-    hiddenimports=['weasyprint'],
+    hiddenimports=['weasyprint', 'main'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
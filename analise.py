@@ -0,0 +1,202 @@
+import re
+from datetime import timedelta
+
+import numpy as np
+
+import arquivo
+import frota
+import models
+
+# ==========================================================
+# 📈 ANÁLISE DE OPERAÇÃO DOS EQUIPAMENTOS (HEATMAP)
+# ==========================================================
+# Monta a matriz equipamento × checklist (ou × turno) a partir dos mapas de
+# bits de operacao_checklist, com as linhas antigas de
+# status_operacao_checklist como reserva, e calcula utilização, sequências
+# de operação e pares que operam juntos com operações vetorizadas do NumPy.
+
+# Horário de cada turno (hora de início, hora de fim). O 3° atravessa a
+# meia-noite: no agrupamento por turno, o checklist das 02:00 conta no turno
+# que começou na véspera, e não numa coluna separada do dia seguinte.
+TURNOS = {"1": (6, 14), "2": (14, 22), "3": (22, 6)}
+_NUMERO_TURNO = re.compile(r"\s*(\d)")
+
+
+def _mascaras_periodo(db, inicio, fim):
+    """[(checklist_id, data, turno, {chave: máscara})] em ordem cronológica."""
+    periodo = (models.Checklist.data_criacao >= inicio, models.Checklist.data_criacao < fim)
+    mascaras = {}
+
+    for checklist_id, mapa in (
+        db.query(models.OperacaoChecklist.checklist_id, models.OperacaoChecklist.mapa)
+        .join(models.Checklist)
+        .filter(*periodo)
+    ):
+        mascaras[checklist_id] = frota.decodificar(mapa)
+
+    # Checklists gravados antes do mapa de bits
+    legado = {}
+    for linha in (
+        db.query(models.StatusOperacaoChecklist.checklist_id, models.StatusOperacaoChecklist.nome_equipamento)
+        .join(models.Checklist)
+        .filter(*periodo)
+    ):
+        if linha.checklist_id not in mascaras:
+            legado.setdefault(linha.checklist_id, []).append(linha)
+    for checklist_id, linhas in legado.items():
+        mascaras[checklist_id] = frota.mascaras_de_legado(linhas)
+
+    # Arquivados antes da conversão (python frota.py cria os mapas deles)
+    arquivados = [
+        linha[0] for linha in
+        db.query(models.ChecklistArquivo.checklist_id)
+        .join(models.Checklist)
+        .filter(*periodo, models.ChecklistArquivo.total_operacoes > 0)
+    ]
+    for checklist_id in arquivados:
+        if checklist_id not in mascaras:
+            _, operacoes = arquivo.descompactar(db.get(models.ChecklistArquivo, checklist_id).dados)
+            mascaras[checklist_id] = frota.mascaras_de_legado(operacoes)
+
+    checklists = (
+        db.query(models.Checklist.id, models.Checklist.data_criacao, models.Checklist.turno)
+        .filter(*periodo)
+        .order_by(models.Checklist.data_criacao, models.Checklist.id)
+    )
+    checklists = checklists.all()
+
+    # Checklist main sem nenhum equipamento marcado não tem linhas de operação,
+    # mas conta no denominador da utilização. Supplier nunca traz equipamentos.
+    sem_mascara = [c.id for c in checklists if c.id not in mascaras]
+    locais = arquivo.locais_checklists(db, sem_mascara)
+    vazia = {t.chave: 0 for t in frota.FROTA}
+    return [
+        (c.id, c.data_criacao, c.turno, mascaras.get(c.id, vazia))
+        for c in checklists
+        if c.id in mascaras or locais[c.id] == "main"
+    ]
+
+
+def matriz_operacao(mascaras, tipos):
+    """Matriz booleana (equipamentos × checklists) e os nomes das linhas."""
+    nomes = []
+    blocos = []
+    for t in tipos:
+        valores = np.array([m.get(t.chave, 0) for m in mascaras], dtype=np.int64)
+        bits = (valores[None, :] >> np.arange(t.quantidade, dtype=np.int64)[:, None]) & 1
+        blocos.append(bits.astype(bool))
+        nomes += [f"{t.tipo} {n:02d}" for n in range(1, t.quantidade + 1)]
+    if not blocos:
+        return np.zeros((0, len(mascaras)), dtype=bool), nomes
+    return np.vstack(blocos), nomes
+
+
+def data_do_turno(data, turno):
+    """Dia em que o turno do checklist começou."""
+    numero = _NUMERO_TURNO.match(turno or "")
+    inicio, fim = TURNOS.get(numero.group(1) if numero else None, (0, 24))
+    # Turno que vira a noite: manhã ainda é o turno da véspera
+    if inicio > fim and data.hour < 12:
+        return data.date() - timedelta(days=1)
+    return data.date()
+
+
+def agrupar_turnos(matriz, chaves):
+    """Fração dos checklists de cada turno em que o equipamento estava operando."""
+    posicoes = {}
+    inverso = np.array([posicoes.setdefault(chave, len(posicoes)) for chave in chaves], dtype=np.int64)
+    contagem = np.bincount(inverso, minlength=len(posicoes))
+    somas = np.zeros((matriz.shape[0], len(posicoes)))
+    np.add.at(somas.T, inverso, matriz.T)
+    return somas / np.maximum(contagem, 1), list(posicoes)
+
+
+def sequencias(operando):
+    """(maior sequência, sequência atual, partidas) de cada linha de uma matriz booleana."""
+    linhas, colunas = operando.shape
+    borda = np.zeros((linhas, 1), dtype=np.int8)
+    transicoes = np.diff(np.hstack([borda, operando.astype(np.int8), borda]), axis=1)
+
+    # nonzero percorre linha a linha, então inícios e fins ficam pareados
+    linha_inicio, inicio = np.nonzero(transicoes == 1)
+    _, fim = np.nonzero(transicoes == -1)
+    duracao = fim - inicio
+
+    maior = np.zeros(linhas, dtype=np.int64)
+    np.maximum.at(maior, linha_inicio, duracao)
+    atual = np.zeros(linhas, dtype=np.int64)
+    termina_no_fim = fim == colunas
+    atual[linha_inicio[termina_no_fim]] = duracao[termina_no_fim]
+    partidas = np.bincount(linha_inicio, minlength=linhas)
+    return maior, atual, partidas
+
+
+def cooperacao(operando):
+    """Índice de Jaccard entre pares de equipamentos e a contagem de operação conjunta."""
+    b = operando.astype(np.float32)
+    juntos = b @ b.T
+    individual = np.diag(juntos)
+    uniao = individual[:, None] + individual[None, :] - juntos
+    jaccard = np.divide(juntos, uniao, out=np.zeros_like(juntos), where=uniao > 0)
+    return jaccard, juntos
+
+
+def heatmap_operacao(db, inicio, fim, agrupar="checklist", chaves=None, pares=10):
+    tipos = [t for t in frota.FROTA if not chaves or t.chave in chaves]
+    dados = _mascaras_periodo(db, inicio, fim)
+    operando, nomes = matriz_operacao([d[3] for d in dados], tipos)
+
+    if agrupar == "turno":
+        valores, grupos = agrupar_turnos(
+            operando, [(data_do_turno(data, turno), turno or "") for _, data, turno, _ in dados]
+        )
+        colunas = [f"{dia.strftime('%d/%m/%Y')} {turno}".strip() for dia, turno in grupos]
+        referencias = None
+        # No turno conta como operando se rodou em algum checklist do turno
+        base = valores > 0
+    else:
+        valores = operando.astype(np.float64)
+        colunas = [data.strftime("%d/%m/%Y %H:%M") for _, data, _, _ in dados]
+        referencias = [checklist_id for checklist_id, _, _, _ in dados]
+        base = operando
+
+    utilizacao = valores.mean(axis=1) if valores.shape[1] else np.zeros(len(nomes))
+    maior, atual, partidas = sequencias(base)
+    jaccard, juntos = cooperacao(base)
+
+    i, j = np.triu_indices(len(nomes), k=1)
+    ordem = np.argsort(-jaccard[i, j], kind="stable")[:pares]
+    melhores = [
+        {
+            "a": nomes[i[k]],
+            "b": nomes[j[k]],
+            "jaccard": round(float(jaccard[i[k], j[k]]), 3),
+            "juntos": int(juntos[i[k], j[k]]),
+        }
+        for k in ordem if juntos[i[k], j[k]] > 0
+    ]
+
+    return {
+        "agrupamento": agrupar,
+        "total_checklists": len(dados),
+        "equipamentos": [
+            {
+                "nome": nome,
+                "utilizacao": round(float(utilizacao[n]), 4),
+                "maior_sequencia": int(maior[n]),
+                "sequencia_atual": int(atual[n]),
+                "partidas": int(partidas[n]),
+            }
+            for n, nome in enumerate(nomes)
+        ],
+        "heatmap": {
+            "linhas": nomes,
+            "colunas": colunas,
+            "checklist_ids": referencias,
+            "valores": np.round(valores, 3).tolist(),
+        },
+        "cooperacao": {
+            "valores": np.round(jaccard, 3).tolist(),
+            "pares": melhores,
+        },
+    }
@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import text
+
+import frota
+import models
+import sincronizacao
+
+# ==========================================================
+# 🗄️ ARQUIVAMENTO DE CHECKLISTS ANTIGOS (QUENTE / FRIO)
+# ==========================================================
+# Checklists mais antigos que o horizonte configurado têm suas linhas de
+# itens_registro e status_operacao_checklist movidas para um único blob
+# comprimido em checklist_arquivo. O cabeçalho (tabela checklist) continua
+# no lugar, então históricos e links não mudam; a leitura dos itens passa
+# por carregar_checklist(), que decide entre a tabela quente e o arquivo.
+
+HORIZONTE_DIAS = int(os.getenv("CHECKLIST_ARQUIVO_DIAS", "365"))
+
+COLUNAS_REGISTRO = [
+    "id", "sistema", "descricao", "unidade", "valor_min", "valor_max",
+    "valor_registrado", "status_ok", "comentario", "item_id",
+]
+COLUNAS_OPERACAO = ["id", "nome_equipamento", "tipo", "status", "tecnico", "turno", "data_registro"]
+
+
+def local_do_checklist(registros):
+    return "supplier" if any(r.sistema in models.SISTEMAS_SUPPLIER for r in registros) else "main"
+
+
+# ==========================================================
+# 📦 FORMATO DO ARQUIVO: JSON COLUNAR + ZLIB
+# ==========================================================
+def _colunas(objetos, campos):
+    # Uma lista por coluna: valores repetidos (sistema, unidade...) ficam
+    # lado a lado e comprimem muito melhor do que linha a linha
+    return {
+        campo: [
+            valor.isoformat() if isinstance(valor, datetime) else valor
+            for valor in (getattr(o, campo, None) for o in objetos)
+        ]
+        for campo in campos
+    }
+
+
+def _linhas(colunas, campos):
+    total = len(colunas[campos[0]]) if colunas else 0
+    # Arquivos da versão 1 não têm item_id: a coluna volta vazia
+    colunas = {campo: colunas.get(campo) or [None] * total for campo in campos}
+    return [SimpleNamespace(**{campo: colunas[campo][i] for campo in campos}) for i in range(total)]
+
+
+def compactar(registros, operacoes):
+    bruto = json.dumps({
+        "v": 2,
+        "registros": _colunas(registros, COLUNAS_REGISTRO),
+        "operacoes": _colunas(operacoes, COLUNAS_OPERACAO),
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(bruto, 9), len(bruto)
+
+
+def descompactar(dados):
+    conteudo = json.loads(zlib.decompress(dados).decode("utf-8"))
+    registros = _linhas(conteudo["registros"], COLUNAS_REGISTRO)
+    operacoes = _linhas(conteudo["operacoes"], COLUNAS_OPERACAO)
+    for op in operacoes:
+        if op.data_registro:
+            op.data_registro = datetime.fromisoformat(op.data_registro)
+    return registros, operacoes
+
+
+# ==========================================================
+# 📖 LEITURA TRANSPARENTE (QUENTE OU ARQUIVADO)
+# ==========================================================
+def _linhas_quentes(db, checklist_id):
+    registros = (
+        db.query(models.ItemRegistro)
+        .filter(models.ItemRegistro.checklist_id == checklist_id)
+        .order_by(models.ItemRegistro.id)
+        .all()
+    )
+    operacoes = (
+        db.query(models.StatusOperacaoChecklist)
+        .filter(models.StatusOperacaoChecklist.checklist_id == checklist_id)
+        .all()
+    )
+    return registros, operacoes
+
+
+def carregar_checklist(db, checklist_id):
+    """Retorna (registros, operacoes) do checklist, vindos da tabela quente ou do arquivo.
+
+    Checklists gravados com o mapa de bits (operacao_checklist) têm as
+    operações decodificadas no mesmo formato das linhas antigas.
+    """
+    registros, operacoes = _linhas_quentes(db, checklist_id)
+    if not registros and not operacoes:
+        arquivado = db.get(models.ChecklistArquivo, checklist_id)
+        if arquivado:
+            registros, operacoes = descompactar(arquivado.dados)
+
+    operacao = db.get(models.OperacaoChecklist, checklist_id)
+    if operacao:
+        operacoes = frota.equipamentos_operando(operacao.mapa)
+    return registros, operacoes
+
+
+def locais_checklists(db, checklist_ids):
+    """{checklist_id: "main" | "supplier"} com duas consultas, sem abrir os arquivos."""
+    if not checklist_ids:
+        return {}
+
+    supplier = {
+        linha[0] for linha in
+        db.query(models.ItemRegistro.checklist_id)
+        .join(models.ItemModelo, models.ItemRegistro.modelo_id == models.ItemModelo.id)
+        .filter(
+            models.ItemRegistro.checklist_id.in_(checklist_ids),
+            models.ItemModelo.sistema.in_(models.SISTEMAS_SUPPLIER)
+        )
+        .distinct()
+    }
+    arquivados = dict(
+        db.query(models.ChecklistArquivo.checklist_id, models.ChecklistArquivo.local)
+        .filter(models.ChecklistArquivo.checklist_id.in_(checklist_ids))
+        .all()
+    )
+    return {
+        cid: arquivados.get(cid) or ("supplier" if cid in supplier else "main")
+        for cid in checklist_ids
+    }
+
+
+# ==========================================================
+# 🧊 JOB DE ARQUIVAMENTO
+# ==========================================================
+def arquivar_antigos(db, dias=HORIZONTE_DIAS, lote=100):
+    limite = datetime.now() - timedelta(days=dias)
+    resumo = {"checklists": 0, "registros": 0, "operacoes": 0, "bytes_brutos": 0, "bytes_compactados": 0}
+
+    while True:
+        ids = [
+            linha[0] for linha in
+            db.query(models.Checklist.id)
+            .outerjoin(models.ChecklistArquivo)
+            .filter(
+                models.Checklist.data_criacao < limite,
+                models.ChecklistArquivo.checklist_id.is_(None),
+                # Estação com alteração ainda não enviada à central espera o envio
+                models.Checklist.id.not_in(sincronizacao.checklists_pendentes(db)),
+            )
+            .order_by(models.Checklist.id)
+            .limit(lote)
+        ]
+        if not ids:
+            break
+
+        for checklist_id in ids:
+            # O mapa de bits (uma linha curta) fica na tabela quente; só as linhas antigas são arquivadas
+            registros, operacoes = _linhas_quentes(db, checklist_id)
+            dados, tamanho_bruto = compactar(registros, operacoes)
+
+            db.add(models.ChecklistArquivo(
+                checklist_id=checklist_id,
+                local=local_do_checklist(registros),
+                total_registros=len(registros),
+                total_operacoes=len(operacoes),
+                tamanho_bruto=tamanho_bruto,
+                dados=dados
+            ))
+            db.add_all(_itens_do_arquivo(checklist_id, {r.item_id for r in registros}))
+
+            # Equipamentos do formato antigo também viram mapa de bits, para a análise
+            # de operação (analise.py) não precisar abrir o arquivo
+            if operacoes and not db.get(models.OperacaoChecklist, checklist_id):
+                db.add(models.OperacaoChecklist(
+                    checklist_id=checklist_id,
+                    mapa=frota.codificar(frota.mascaras_de_legado(operacoes))
+                ))
+
+            resumo["checklists"] += 1
+            resumo["registros"] += len(registros)
+            resumo["operacoes"] += len(operacoes)
+            resumo["bytes_brutos"] += tamanho_bruto
+            resumo["bytes_compactados"] += len(dados)
+
+        # Remove as linhas quentes na mesma transação em que o arquivo é gravado
+        db.query(models.ItemRegistro).filter(
+            models.ItemRegistro.checklist_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.query(models.StatusOperacaoChecklist).filter(
+            models.StatusOperacaoChecklist.checklist_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    return resumo
+
+
+def _itens_do_arquivo(checklist_id, item_ids):
+    return [
+        models.ChecklistArquivoItem(checklist_id=checklist_id, item_id=item_id)
+        for item_id in sorted(i for i in item_ids if i is not None)
+    ]
+
+
+def indexar_arquivados(db, lote=100):
+    """Preenche checklist_arquivo_itens para arquivos gravados antes da tabela existir.
+
+    Arquivos da versão 1 não trazem item_id: o item vem das versões
+    (itens_modelo) com o mesmo sistema e descrição.
+    """
+    versoes = {}
+    for item_id, sistema, descricao in db.query(
+        models.ItemModelo.item_id, models.ItemModelo.sistema, models.ItemModelo.descricao
+    ):
+        if item_id is not None:
+            versoes.setdefault((sistema, descricao), set()).add(item_id)
+
+    pendentes = [
+        linha[0] for linha in
+        db.query(models.ChecklistArquivo.checklist_id)
+        .outerjoin(models.ChecklistArquivoItem)
+        .filter(models.ChecklistArquivo.total_registros > 0, models.ChecklistArquivoItem.checklist_id.is_(None))
+        .order_by(models.ChecklistArquivo.checklist_id)
+    ]
+    for n in range(0, len(pendentes), lote):
+        blobs = (
+            db.query(models.ChecklistArquivo.checklist_id, models.ChecklistArquivo.dados)
+            .filter(models.ChecklistArquivo.checklist_id.in_(pendentes[n:n + lote]))
+            .all()
+        )
+        for checklist_id, dados in blobs:
+            item_ids = set()
+            for r in descompactar(dados)[0]:
+                item_ids |= {r.item_id} if r.item_id is not None else versoes.get((r.sistema, r.descricao), set())
+            db.add_all(_itens_do_arquivo(checklist_id, item_ids))
+        db.commit()
+    return len(pendentes)
+
+
+# ==========================================================
+# 📏 MEDIÇÃO DE TAMANHO E LATÊNCIA
+# ==========================================================
+def tamanho_tabela(db, tabela):
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "mysql":
+        sql = ("SELECT data_length + index_length FROM information_schema.tables "
+               "WHERE table_schema = DATABASE() AND table_name = :tabela")
+    elif dialeto == "sqlite":
+        sql = ("SELECT SUM(pgsize) FROM dbstat WHERE name = :tabela OR name IN "
+               "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :tabela)")
+    else:
+        return None
+    try:
+        return db.execute(text(sql), {"tabela": tabela}).scalar()
+    except Exception:
+        return None
+
+
+def medir(db, amostra=20):
+    recentes = [
+        linha[0] for linha in
+        db.query(models.Checklist.id).order_by(models.Checklist.data_criacao.desc()).limit(amostra)
+    ]
+    antigos = [linha[0] for linha in db.query(models.ChecklistArquivo.checklist_id).limit(amostra)]
+
+    def latencia(ids):
+        if not ids:
+            return None
+        inicio = time.perf_counter()
+        for checklist_id in ids:
+            carregar_checklist(db, checklist_id)
+        return round((time.perf_counter() - inicio) * 1000 / len(ids), 2)
+
+    return {
+        "linhas_itens_registro": db.query(models.ItemRegistro).count(),
+        "bytes_itens_registro": tamanho_tabela(db, "itens_registro"),
+        "bytes_checklist_arquivo": tamanho_tabela(db, "checklist_arquivo"),
+        "ms_checklist_recente": latencia(recentes),
+        "ms_checklist_arquivado": latencia(antigos),
+    }
+
+
+# ==========================================================
+# 🧰 LINHA DE COMANDO: python arquivo.py --dias 365 --medir
+# ==========================================================
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Arquiva checklists antigos em formato comprimido.")
+    parser.add_argument("--dias", type=int, default=HORIZONTE_DIAS, help="idade mínima (dias) para arquivar")
+    parser.add_argument("--lote", type=int, default=100, help="checklists por transação")
+    parser.add_argument("--medir", action="store_true", help="mede tamanho e latência antes e depois")
+    parser.add_argument("--so-indexar", action="store_true",
+                        help="só registra os itens dos arquivos antigos (checklist_arquivo_itens), sem arquivar")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        indexados = indexar_arquivados(db)
+        if indexados or args.so_indexar:
+            print(f"🗂️ {indexados} arquivos antigos com os itens registrados.")
+        if args.so_indexar:
+            sys.exit(0)
+
+        antes = medir(db) if args.medir else None
+        resumo = arquivar_antigos(db, dias=args.dias, lote=args.lote)
+
+        print(f"✅ {resumo['checklists']} checklists arquivados "
+              f"({resumo['registros']} itens, {resumo['operacoes']} equipamentos).")
+        if resumo["bytes_brutos"]:
+            taxa = resumo["bytes_brutos"] / max(resumo["bytes_compactados"], 1)
+            print(f"   {resumo['bytes_brutos']} bytes → {resumo['bytes_compactados']} bytes (x{taxa:.1f})")
+
+        if antes:
+            depois = medir(db)
+            print(f"{'métrica':<26}{'antes':>14}{'depois':>14}")
+            for chave in antes:
+                print(f"{chave:<26}{str(antes[chave]):>14}{str(depois[chave]):>14}")
+    finally:
+        db.close()
@@ -0,0 +1,175 @@
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# ==========================================================
+# ⏱️ BENCHMARK DA ESTAÇÃO (SQLITE EMBARCADO)
+# ==========================================================
+# Sobe o servidor (uvicorn, processo separado) com um banco SQLite próprio e
+# simula vários técnicos usando a mesma estação: cada usuário salva checklists completos e
+# abre detalhes, histórico e dashboard. Mostra vazão e latência por operação.
+#
+#   python benchmark_estacao.py --usuarios 8 --segundos 30
+#   python benchmark_estacao.py --sem-ajustes     (mesmo teste sem os PRAGMAs)
+#   python benchmark_estacao.py --banco C:/ChecklistEnergy/copia.db
+
+SISTEMAS_MAIN = ["Ar Comprimido", "Água de Resfriamento", "Água Gelada",
+                 "Climatizacao_f", "Climatizacao_m", "Climatizacao_c"]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def preparar_banco(models, frota, SessionLocal):
+    """Catálogo e equipamentos de exemplo quando o banco está vazio."""
+    db = SessionLocal()
+    try:
+        if db.query(models.ItemChecklist).count() == 0:
+            for n in range(120):
+                db.add(models.ItemChecklist(
+                    sistema=SISTEMAS_MAIN[n % len(SISTEMAS_MAIN)],
+                    descricao=f"Item de teste {n + 1:03d}",
+                    unidade="°C", valor_min=5.0, valor_max=12.0
+                ))
+        if db.query(models.StatusEquipamento).count() == 0:
+            for t in frota.FROTA:
+                for numero in range(1, t.quantidade + 1):
+                    db.add(models.StatusEquipamento(nome_equipamento=f"{t.tipo} {numero:02d}", tipo=t.tipo, status="OK"))
+        db.commit()
+        itens = [item.id for item in db.query(models.ItemChecklist).all() if item.sistema in SISTEMAS_MAIN]
+        return itens, db.query(models.Checklist).count()
+    finally:
+        db.close()
+
+
+def formulario(itens, frota, usuario):
+    dados = {
+        "tecnico": f"Benchmark {usuario}",
+        "especialidade_tecnico": "Mecânico",
+        "turno": "1°",
+        "tipo_turno": "Produtivo",
+    }
+    for item_id in itens:
+        dados[f"valor_{item_id}"] = f"{random.uniform(4, 13):.2f}"
+        dados[f"ok_{item_id}"] = "on"
+    for t in frota.FROTA:
+        for numero in range(1, t.quantidade + 1):
+            if random.random() < 0.5:
+                dados[f"{t.chave}_{numero}"] = "on"
+    return dados
+
+
+def usuario(base, itens, frota, fim, medicoes, erros, salvos, numero):
+    import requests
+
+    sessao = requests.Session()
+    while time.perf_counter() < fim:
+        for operacao in ("salvar", "detalhes", "historico", "dashboard", "detalhes"):
+            inicio = time.perf_counter()
+            try:
+                if operacao == "salvar":
+                    r = sessao.post(f"{base}/salvar_main", data=formulario(itens, frota, numero), allow_redirects=False)
+                    ok = r.status_code == 303
+                    if ok:
+                        salvos.append(1)
+                elif operacao == "detalhes":
+                    r = sessao.get(f"{base}/checklist/{random.randint(1, max(len(salvos), 1))}")
+                    ok = r.status_code == 200
+                elif operacao == "historico":
+                    r = sessao.get(f"{base}/historico_checklist")
+                    ok = r.status_code == 200
+                else:
+                    r = sessao.get(f"{base}/dashboard_equipamentos")
+                    ok = r.status_code == 200
+            except Exception:
+                ok = False
+            duracao = time.perf_counter() - inicio
+            if ok:
+                medicoes.setdefault(operacao, []).append(duracao)
+            else:
+                erros[operacao] = erros.get(operacao, 0) + 1
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de gravação/leitura no SQLite embarcado.")
+    parser.add_argument("--usuarios", type=int, default=8)
+    parser.add_argument("--segundos", type=int, default=30)
+    parser.add_argument("--banco", help="arquivo SQLite (padrão: temporário)")
+    parser.add_argument("--sem-ajustes", action="store_true", help="não aplica os PRAGMAs (comparação)")
+    args = parser.parse_args()
+
+    banco = args.banco or os.path.join(tempfile.mkdtemp(prefix="checklist_bench_"), "bench.db")
+    os.environ["CHECKLIST_DB_URL"] = "sqlite:///" + banco.replace(os.sep, "/")
+    if args.sem_ajustes:
+        os.environ["CHECKLIST_SQLITE_AJUSTES"] = "0"
+
+    # Importa depois de definir o banco
+    import requests
+    import frota
+    import models
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    itens, existentes = preparar_banco(models, frota, SessionLocal)
+
+    porta = porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(porta), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=os.environ.copy(),
+    )
+    try:
+        for _ in range(200):
+            try:
+                requests.get(f"{base}/dashboard_equipamentos", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+        medicoes, erros = {}, {}
+        salvos = [1] * existentes
+        fim = time.perf_counter() + args.segundos
+        usuarios = [
+            threading.Thread(target=usuario, args=(base, itens, frota, fim, medicoes, erros, salvos, n))
+            for n in range(args.usuarios)
+        ]
+        for t in usuarios:
+            t.start()
+        for t in usuarios:
+            t.join()
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    print(f"\nSQLite {'sem ajustes' if args.sem_ajustes else 'com WAL/PRAGMAs'} — "
+          f"{args.usuarios} usuários, {args.segundos}s, banco {banco}")
+    print(f"{'operação':<12}{'total':>8}{'por s':>9}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}{'erros':>8}")
+    for operacao in ("salvar", "detalhes", "historico", "dashboard"):
+        tempos = medicoes.get(operacao, [])
+        if not tempos:
+            print(f"{operacao:<12}{0:>8}{'-':>9}{'-':>10}{'-':>10}{'-':>10}{erros.get(operacao, 0):>8}")
+            continue
+        print(f"{operacao:<12}{len(tempos):>8}{len(tempos) / args.segundos:>9.1f}"
+              f"{statistics.median(tempos) * 1000:>10.1f}{percentil(tempos, 0.95) * 1000:>10.1f}"
+              f"{max(tempos) * 1000:>10.1f}{erros.get(operacao, 0):>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import re
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, bindparam, delete, event, insert, select, text
+
+import arquivo
+import models
+
+# ==========================================================
+# 🔎 BUSCA TEXTUAL EM COMENTÁRIOS E OBSERVAÇÕES
+# ==========================================================
+# Os textos de ItemRegistro.comentario e HistoricoStatus.observacao são
+# copiados, já normalizados, para a tabela indice_busca no momento do INSERT.
+# A busca usa o índice FULLTEXT do MySQL ou a tabela FTS5 do SQLite; o
+# filtro por data/sistema/equipamento é feito nas colunas indexadas.
+
+# Palavras muito comuns do português ignoradas na consulta
+STOPWORDS = {
+    "a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "no", "na",
+    "nos", "nas", "um", "uma", "com", "por", "para", "que", "se", "ao", "aos",
+}
+
+# Tamanho mínimo de token do FULLTEXT InnoDB (innodb_ft_min_token_size)
+TAMANHO_MINIMO_MYSQL = 3
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos e só com letras/números: 'Vazamento ÓLEO!' → 'vazamento oleo'."""
+    if not texto:
+        return ""
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return " ".join(re.findall(r"\w+", sem_acentos.lower()))
+
+
+def termos_consulta(consulta, dialeto):
+    termos = [t for t in normalizar_texto(consulta).split() if t not in STOPWORDS]
+    if dialeto == "mysql":
+        termos = [t for t in termos if len(t) >= TAMANHO_MINIMO_MYSQL]
+    return termos
+
+
+# ==========================================================
+# ✍️ MANUTENÇÃO DO ÍNDICE NO MOMENTO DA GRAVAÇÃO
+# ==========================================================
+def _linha_item(connection, registro):
+    data = connection.execute(
+        select(models.Checklist.data_criacao).where(models.Checklist.id == registro.checklist_id)
+    ).scalar()
+
+    if isinstance(registro, models.ItemRegistro):
+        # Dentro do flush: lê o modelo pela conexão em vez de carregar a relação
+        sistema, titulo = connection.execute(
+            select(models.ItemModelo.sistema, models.ItemModelo.descricao)
+            .where(models.ItemModelo.id == registro.modelo_id)
+        ).first() or (None, None)
+    else:
+        # Registro vindo de um checklist arquivado (campos já desnormalizados)
+        sistema, titulo = registro.sistema, registro.descricao
+
+    return {
+        "origem": "item",
+        "origem_id": registro.id,
+        "checklist_id": registro.checklist_id,
+        "equipamento_id": None,
+        "sistema": sistema,
+        "titulo": titulo,
+        "data": data,
+        "texto": registro.comentario,
+        "texto_busca": normalizar_texto(registro.comentario),
+    }
+
+
+def _linha_status(connection, historico):
+    equipamento = connection.execute(
+        select(models.StatusEquipamento.nome_equipamento, models.StatusEquipamento.tipo)
+        .where(models.StatusEquipamento.id == historico.equipamento_id)
+    ).first()
+    return {
+        "origem": "status",
+        "origem_id": historico.id,
+        "checklist_id": None,
+        "equipamento_id": historico.equipamento_id,
+        "sistema": equipamento.tipo if equipamento else None,
+        "titulo": equipamento.nome_equipamento if equipamento else None,
+        "data": historico.data_modificacao or datetime.now(),
+        "texto": historico.observacao,
+        "texto_busca": normalizar_texto(historico.observacao),
+    }
+
+
+@event.listens_for(models.ItemRegistro, "after_insert")
+def _indexar_item(mapper, connection, registro):
+    if registro.comentario and registro.comentario.strip():
+        connection.execute(insert(models.IndiceBusca), _linha_item(connection, registro))
+
+
+@event.listens_for(models.HistoricoStatus, "after_insert")
+def _indexar_status(mapper, connection, historico):
+    if historico.observacao and historico.observacao.strip():
+        connection.execute(insert(models.IndiceBusca), _linha_status(connection, historico))
+
+
+def _em_blocos(db, consulta, coluna_id, lote):
+    # Paginação por id (sem cursor aberto): a montagem das linhas faz
+    # outras consultas na mesma conexão enquanto percorre os blocos
+    ultimo = None
+    while True:
+        bloco = consulta
+        if ultimo is not None:
+            bloco = bloco.filter(coluna_id > ultimo)
+        bloco = bloco.order_by(coluna_id).limit(lote).all()
+        if not bloco:
+            return
+        yield from bloco
+        ultimo = getattr(bloco[-1], coluna_id.key)
+
+
+def _textos_existentes(db, connection, lote):
+    for modelo, campo, montar in (
+        (models.ItemRegistro, models.ItemRegistro.comentario, _linha_item),
+        (models.HistoricoStatus, models.HistoricoStatus.observacao, _linha_status),
+    ):
+        consulta = db.query(modelo).filter(campo.isnot(None), campo != "")
+        for objeto in _em_blocos(db, consulta, modelo.id, lote):
+            yield montar(connection, objeto)
+
+    # Comentários de checklists já arquivados
+    consulta = db.query(models.ChecklistArquivo)
+    for arquivado in _em_blocos(db, consulta, models.ChecklistArquivo.checklist_id, 100):
+        registros, _ = arquivo.descompactar(arquivado.dados)
+        for registro in registros:
+            if registro.comentario and registro.comentario.strip():
+                registro.checklist_id = arquivado.checklist_id
+                yield _linha_item(connection, registro)
+
+
+def reindexar(db, lote=1000):
+    """Reconstrói o índice a partir dos dados existentes (carga inicial)."""
+    db.execute(delete(models.IndiceBusca))
+    connection = db.connection()
+    total = 0
+
+    linhas = []
+    for linha in _textos_existentes(db, connection, lote):
+        linhas.append(linha)
+        if len(linhas) >= lote:
+            connection.execute(insert(models.IndiceBusca), linhas)
+            total += len(linhas)
+            linhas = []
+    if linhas:
+        connection.execute(insert(models.IndiceBusca), linhas)
+        total += len(linhas)
+
+    db.commit()
+    return total
+
+
+# ==========================================================
+# 🔍 CONSULTA
+# ==========================================================
+def buscar(db, consulta, data_inicial=None, data_final=None, sistema=None, equipamento_id=None, limite=20):
+    dialeto = db.get_bind().dialect.name
+    termos = termos_consulta(consulta, dialeto)
+    if not termos:
+        return []
+
+    filtros = []
+    parametros = {"limite": limite}
+    tipos = [bindparam("limite", type_=Integer)]
+
+    if data_inicial:
+        filtros.append("i.data >= :data_inicial")
+        parametros["data_inicial"] = data_inicial
+        tipos.append(bindparam("data_inicial", type_=DateTime))
+    if data_final:
+        filtros.append("i.data < :data_final")
+        parametros["data_final"] = data_final
+        tipos.append(bindparam("data_final", type_=DateTime))
+    if sistema:
+        filtros.append("i.sistema = :sistema")
+        parametros["sistema"] = sistema
+        tipos.append(bindparam("sistema", type_=String))
+    if equipamento_id:
+        filtros.append("i.equipamento_id = :equipamento_id")
+        parametros["equipamento_id"] = equipamento_id
+        tipos.append(bindparam("equipamento_id", type_=Integer))
+
+    extra = "".join(f" AND {f}" for f in filtros)
+    colunas = "i.origem, i.origem_id, i.checklist_id, i.equipamento_id, i.sistema, i.titulo, i.data, i.texto"
+
+    if dialeto == "sqlite":
+        # Prefixo em cada termo ("vazament*" encontra vazamento/vazamentos)
+        parametros["consulta"] = " ".join(f'"{t}"*' for t in termos)
+        sql = (
+            f"SELECT {colunas}, bm25(indice_busca_fts) AS relevancia "
+            "FROM indice_busca_fts JOIN indice_busca i ON i.id = indice_busca_fts.rowid "
+            f"WHERE indice_busca_fts MATCH :consulta{extra} "
+            "ORDER BY relevancia LIMIT :limite"
+        )
+    elif dialeto == "mysql":
+        parametros["consulta"] = " ".join(f"+{t}*" for t in termos)
+        sql = (
+            f"SELECT {colunas}, MATCH(i.texto_busca) AGAINST (:consulta IN BOOLEAN MODE) AS relevancia "
+            "FROM indice_busca i "
+            f"WHERE MATCH(i.texto_busca) AGAINST (:consulta IN BOOLEAN MODE){extra} "
+            "ORDER BY relevancia DESC LIMIT :limite"
+        )
+    else:
+        condicoes = []
+        for n, termo in enumerate(termos):
+            parametros[f"termo{n}"] = f"%{termo}%"
+            condicoes.append(f"i.texto_busca LIKE :termo{n}")
+        sql = (
+            f"SELECT {colunas}, 0 AS relevancia FROM indice_busca i "
+            f"WHERE {' AND '.join(condicoes)}{extra} ORDER BY i.data DESC LIMIT :limite"
+        )
+
+    linhas = db.execute(text(sql).bindparams(*tipos), parametros).mappings().all()
+    return [_resultado(linha) for linha in linhas]
+
+
+def _resultado(linha):
+    if linha["origem"] == "item":
+        link = f"/checklist/{linha['checklist_id']}"
+    else:
+        link = f"/historico?equipamento_id={linha['equipamento_id']}"
+
+    data = linha["data"]
+    if isinstance(data, str):
+        data = datetime.fromisoformat(data)
+
+    return {
+        "origem": linha["origem"],
+        "id": linha["origem_id"],
+        "checklist_id": linha["checklist_id"],
+        "equipamento_id": linha["equipamento_id"],
+        "sistema": linha["sistema"],
+        "titulo": linha["titulo"],
+        "texto": linha["texto"],
+        "data": data.strftime("%d/%m/%Y %H:%M") if data else None,
+        "relevancia": round(abs(float(linha["relevancia"] or 0)), 4),
+        "link": link,
+    }
+
+
+# ==========================================================
+# 🧰 CARGA INICIAL: python busca.py
+# ==========================================================
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        total = reindexar(db)
+        print(f"✅ Índice de busca reconstruído: {total} textos.")
+    finally:
+        db.close()
@@ -0,0 +1,369 @@
+import argparse
+import functools
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from benchmark_estacao import SISTEMAS_MAIN, porta_livre, percentil
+
+# ==========================================================
+# 🔁 TESTE DE CARGA DA TROCA DE TURNO
+# ==========================================================
+# Reproduz o pior momento do dia: todos os técnicos enviam /salvar_main ou
+# /salvar_supplier ao mesmo tempo (uma "rodada" por troca de turno) enquanto
+# supervisores abrem histórico, detalhes, dashboard e PDFs. Os formulários são
+# montados a partir do catálogo real (ItemChecklist) do banco de
+# CHECKLIST_DB_URL, que precisa ser o mesmo banco do servidor testado.
+#
+# Cada checklist enviado leva um técnico marcador (CARGA-<execução>-T..-R..).
+# No fim o banco é conferido: checklist duplicado, perdido (resposta 303 sem
+# linha gravada) ou parcial (registros faltando, mapa de operação faltando).
+# Como o formulário real, cada envio leva uma chave_envio; --reenvios repete
+# uma fração dos envios com a mesma chave enquanto o primeiro ainda está em
+# andamento (Wi-Fi instável), e nenhum deles pode virar checklist duplicado.
+#
+#   python carga_turno.py --url http://127.0.0.1:8000 --tecnicos 30 --rodadas 3
+#   python carga_turno.py --subir --workers 4 --tecnicos 40 --reenvios 0.3 --limpar
+#   python carga_turno.py --limpar-tudo        (apaga os checklists de todas as execuções)
+
+PREFIXO = "CARGA"
+RECARREGAR_IDS = 2.0                # s entre duas buscas dos checklists salvos (supervisores)
+ENDPOINTS = ("salvar_main", "salvar_supplier", "reenvio", "historico_checklist", "checklist", "gerar_pdf", "dashboard")
+
+
+class Resultados:
+    def __init__(self):
+        self.tempos = {endpoint: [] for endpoint in ENDPOINTS}
+        self.erros = {endpoint: {} for endpoint in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def anotar(self, endpoint, duracao, erro=None):
+        with self._lock:
+            if erro is None:
+                self.tempos[endpoint].append(duracao)
+            else:
+                self.erros[endpoint][erro] = self.erros[endpoint].get(erro, 0) + 1
+
+
+# ==========================================================
+# 📝 FORMULÁRIOS A PARTIR DO CATÁLOGO
+# ==========================================================
+def carregar_catalogo(db, models):
+    itens = db.query(models.ItemChecklist).all()
+    return {
+        "main": [i for i in itens if i.sistema in SISTEMAS_MAIN],
+        "supplier": [i for i in itens if i.sistema in models.SISTEMAS_SUPPLIER],
+    }
+
+
+def _leitura(item, sorteio):
+    minimo = item.valor_min if item.valor_min is not None else 0.0
+    maximo = item.valor_max if item.valor_max is not None else minimo + 10.0
+    if sorteio.random() < 0.05:
+        # Leitura fora da faixa, marcada NOK com comentário
+        return maximo + abs(maximo - minimo) * sorteio.uniform(0.1, 0.5), False
+    return sorteio.uniform(minimo, maximo), True
+
+
+def montar_formulario(itens, local, tecnico, frota, sorteio):
+    dados = {
+        "tecnico": tecnico,
+        "especialidade_tecnico": sorteio.choice(["Mecânico", "Eletricista"]),
+        "team_leader": "Supervisor Carga",
+        "especialidade_team_leader": "Mecânico",
+        "turno": sorteio.choice(["1°", "2°", "3°"]),
+        "tipo_turno": "Produtivo",
+    }
+    for item in itens:
+        if sorteio.random() < 0.03:
+            continue                                    # item deixado em branco
+        valor, ok = _leitura(item, sorteio)
+        dados[f"valor_{item.id}"] = f"{valor:.2f}"
+        dados[f"{'ok' if ok else 'nok'}_{item.id}"] = "on"
+        if not ok:
+            dados[f"coment_{item.id}"] = f"Leitura alta em {item.descricao} (teste de carga)"
+    if local == "main":
+        for t in frota.FROTA:
+            for numero in range(1, t.quantidade + 1):
+                if sorteio.random() < 0.6:
+                    dados[f"{t.chave}_{numero}"] = "on"
+    return dados
+
+
+# ==========================================================
+# 👥 TÉCNICOS E SUPERVISORES
+# ==========================================================
+def _enviar(base, local, dados, args, resultados, endpoint):
+    import requests
+
+    inicio = time.perf_counter()
+    try:
+        r = requests.post(f"{base}/salvar_{local}", data=dados, allow_redirects=False, timeout=args.timeout)
+        erro = None if r.status_code == 303 else f"HTTP {r.status_code}"
+    except requests.RequestException as e:
+        erro = type(e).__name__
+    resultados.anotar(endpoint, time.perf_counter() - inicio, erro)
+    return erro is None
+
+
+def tecnico(base, numero, args, catalogo, frota, largada, resultados, enviados):
+    sorteio = random.Random(numero)
+    for rodada in range(1, args.rodadas + 1):
+        local = "supplier" if catalogo["supplier"] and sorteio.random() < args.proporcao_supplier else "main"
+        marcador = f"{args.execucao}-T{numero:03d}-R{rodada}"
+        dados = montar_formulario(catalogo[local], local, marcador, frota, sorteio)
+        if not args.sem_chave:
+            dados["chave_envio"] = uuid.uuid4().hex
+
+        largada.wait()                                  # todos enviam juntos
+        reenvio = None
+        if sorteio.random() < args.reenvios:
+            # Mesmo formulário de novo, logo depois do primeiro (que ainda está em andamento)
+            reenvio = threading.Timer(sorteio.uniform(0.01, 0.2), _enviar,
+                                      args=(base, local, dados, args, resultados, "reenvio"))
+            reenvio.start()
+        ok = _enviar(base, local, dados, args, resultados, f"salvar_{local}")
+        if reenvio is not None:
+            reenvio.join()
+        enviados[marcador] = (local, ok)
+
+
+def supervisor(base, args, iniciais, recarregar, parar, resultados):
+    import requests
+
+    sessao = requests.Session()
+    ids, recarregado_em = list(iniciais), 0.0
+    while not parar.is_set():
+        if time.monotonic() - recarregado_em > RECARREGAR_IDS:
+            # Banco novo começa sem checklists: abre também os que os técnicos acabaram de salvar
+            ids, recarregado_em = list(iniciais) + recarregar(), time.monotonic()
+        for endpoint in ("historico_checklist", "checklist", "dashboard", "gerar_pdf"):
+            if endpoint in ("checklist", "gerar_pdf") and not ids:
+                continue
+            caminho = {
+                "historico_checklist": "/historico_checklist",
+                "dashboard": "/dashboard_equipamentos",
+                "checklist": f"/checklist/{random.choice(ids)}" if ids else None,
+                "gerar_pdf": f"/gerar_pdf_moderno?checklist_id={random.choice(ids)}" if ids else None,
+            }[endpoint]
+            inicio = time.perf_counter()
+            try:
+                r = sessao.get(base + caminho, timeout=args.timeout)
+                erro = None if r.status_code == 200 else f"HTTP {r.status_code}"
+            except requests.RequestException as e:
+                erro = type(e).__name__
+            resultados.anotar(endpoint, time.perf_counter() - inicio, erro)
+            if parar.is_set():
+                break
+
+
+def checklists_da_execucao(fabrica, models, execucao):
+    with fabrica() as db:
+        return [
+            linha[0] for linha in
+            db.query(models.Checklist.id).filter(models.Checklist.tecnico.like(f"{execucao}-%"))
+        ]
+
+
+# ==========================================================
+# 🔍 CONFERÊNCIA DO BANCO DEPOIS DA CARGA
+# ==========================================================
+def conferir(db, models, execucao, enviados, catalogo):
+    from sqlalchemy import func
+
+    checklists = (
+        db.query(models.Checklist.id, models.Checklist.tecnico)
+        .filter(models.Checklist.tecnico.like(f"{execucao}-%"))
+        .all()
+    )
+    ids = [c.id for c in checklists]
+    registros = dict(
+        db.query(models.ItemRegistro.checklist_id, func.count())
+        .filter(models.ItemRegistro.checklist_id.in_(ids))
+        .group_by(models.ItemRegistro.checklist_id)
+        .all()
+    ) if ids else {}
+    com_operacao = {
+        linha[0] for linha in db.query(models.OperacaoChecklist.checklist_id)
+        .filter(models.OperacaoChecklist.checklist_id.in_(ids))
+    } if ids else set()
+
+    por_marcador = {}
+    for c in checklists:
+        por_marcador.setdefault(c.tecnico, []).append(c.id)
+
+    duplicados = {m: lista for m, lista in por_marcador.items() if len(lista) > 1}
+    perdidos = [m for m, (_, ok) in enviados.items() if ok and m not in por_marcador]
+    parciais = []
+    for marcador, lista in por_marcador.items():
+        local = enviados.get(marcador, ("main", False))[0]
+        esperado = len(catalogo[local])
+        for checklist_id in lista:
+            faltando = esperado - registros.get(checklist_id, 0)
+            sem_mapa = local == "main" and checklist_id not in com_operacao
+            if faltando or sem_mapa:
+                parciais.append((marcador, checklist_id, faltando, sem_mapa))
+    return {
+        "gravados": len(checklists),
+        "duplicados": duplicados,
+        "perdidos": perdidos,
+        "parciais": parciais,
+        "respondidos_com_erro": sum(1 for _, ok in enviados.values() if not ok),
+    }
+
+
+def limpar(db, models, filtro):
+    from sqlalchemy import delete
+
+    ids = [linha[0] for linha in db.query(models.Checklist.id).filter(models.Checklist.tecnico.like(filtro))]
+    for lote in range(0, len(ids), 500):
+        parte = ids[lote:lote + 500]
+        db.execute(delete(models.IndiceBusca).where(models.IndiceBusca.checklist_id.in_(parte)))
+        for tabela in (models.ItemRegistro, models.StatusOperacaoChecklist,
+                       models.OperacaoChecklist, models.ChecklistArquivoItem, models.ChecklistArquivo,
+                       models.ChaveIdempotencia):
+            db.execute(delete(tabela).where(tabela.checklist_id.in_(parte)))
+        db.execute(delete(models.Checklist).where(models.Checklist.id.in_(parte)))
+    db.commit()
+    return len(ids)
+
+
+# ==========================================================
+# 📊 RELATÓRIO
+# ==========================================================
+def relatorio(resultados, duracao):
+    print(f"\n{'endpoint':<22}{'ok':>7}{'por s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'máx ms':>10}{'erros':>7}{'% erro':>8}")
+    for endpoint in ENDPOINTS:
+        tempos = resultados.tempos[endpoint]
+        erros = sum(resultados.erros[endpoint].values())
+        total = len(tempos) + erros
+        if not total:
+            continue
+        taxa = erros / total * 100
+        if tempos:
+            print(f"{endpoint:<22}{len(tempos):>7}{len(tempos) / duracao:>8.1f}"
+                  f"{statistics.median(tempos) * 1000:>10.1f}{percentil(tempos, 0.95) * 1000:>10.1f}"
+                  f"{percentil(tempos, 0.99) * 1000:>10.1f}{max(tempos) * 1000:>10.1f}{erros:>7}{taxa:>7.1f}%")
+        else:
+            print(f"{endpoint:<22}{0:>7}{'-':>8}{'-':>10}{'-':>10}{'-':>10}{'-':>10}{erros:>7}{taxa:>7.1f}%")
+    for endpoint in ENDPOINTS:
+        if resultados.erros[endpoint]:
+            detalhes = ", ".join(f"{erro}: {n}" for erro, n in resultados.erros[endpoint].items())
+            print(f"  ⚠️ {endpoint}: {detalhes}")
+
+
+def _subir_servidor(args):
+    import requests
+
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        [sys.executable, "servidor.py", "--host", "127.0.0.1", "--porta", str(porta),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=os.environ.copy(),
+    )
+    base = f"http://127.0.0.1:{porta}"
+    for _ in range(600):
+        try:
+            if requests.get(f"{base}/pronto", timeout=1).status_code == 200:
+                return processo, base
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+    processo.terminate()
+    raise SystemExit("❌ Servidor não ficou pronto")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da troca de turno.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="servidor já em execução")
+    parser.add_argument("--subir", action="store_true", help="sobe servidor.py numa porta livre com o banco de CHECKLIST_DB_URL")
+    parser.add_argument("--workers", type=int, default=1, help="workers do servidor com --subir")
+    parser.add_argument("--tecnicos", type=int, default=20, help="técnicos enviando juntos em cada rodada")
+    parser.add_argument("--supervisores", type=int, default=4, help="leitores de histórico/PDF durante a carga")
+    parser.add_argument("--rodadas", type=int, default=3, help="trocas de turno seguidas")
+    parser.add_argument("--proporcao-supplier", type=float, default=0.25, help="fração dos envios no Supplier Park")
+    parser.add_argument("--reenvios", type=float, default=0.0, help="fração dos envios repetidos com a mesma chave")
+    parser.add_argument("--sem-chave", action="store_true", help="envia sem chave_envio (formulário antigo, para comparação)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--limpar", action="store_true", help="apaga os checklists desta execução no fim")
+    parser.add_argument("--limpar-tudo", action="store_true", help="só apaga os checklists de todas as execuções")
+    args = parser.parse_args()
+    args.execucao = f"{PREFIXO}-{datetime.now():%Y%m%d%H%M%S}"
+
+    import frota
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.limpar_tudo:
+            print(f"🧹 {limpar(db, models, f'{PREFIXO}-%')} checklists de teste apagados")
+            return 0
+
+        catalogo = carregar_catalogo(db, models)
+        if not catalogo["main"]:
+            raise SystemExit("❌ Catálogo sem itens do Main Plant (ItemChecklist)")
+        if not catalogo["supplier"]:
+            args.proporcao_supplier = 0
+        ids = [linha[0] for linha in db.query(models.Checklist.id).order_by(models.Checklist.id.desc()).limit(200)]
+        db.rollback()
+
+        processo, base = _subir_servidor(args) if args.subir else (None, args.url.rstrip("/"))
+        resultados, enviados = Resultados(), {}
+        largada = threading.Barrier(args.tecnicos)
+        parar = threading.Event()
+        try:
+            inicio = time.perf_counter()
+            recarregar = functools.partial(checklists_da_execucao, SessionLocal, models, args.execucao)
+            leitores = [threading.Thread(target=supervisor, args=(base, args, ids, recarregar, parar, resultados))
+                        for _ in range(args.supervisores)]
+            tecnicos = [threading.Thread(target=tecnico, args=(base, n, args, catalogo, frota, largada, resultados, enviados))
+                        for n in range(1, args.tecnicos + 1)]
+            for t in leitores + tecnicos:
+                t.start()
+            for t in tecnicos:
+                t.join()
+            parar.set()
+            for t in leitores:
+                t.join()
+            duracao = time.perf_counter() - inicio
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait()
+
+        print(f"\n🔁 {args.execucao}: {args.tecnicos} técnicos × {args.rodadas} rodadas, "
+              f"{args.supervisores} supervisores, {duracao:.1f}s em {base}")
+        relatorio(resultados, duracao)
+
+        conferencia = conferir(db, models, args.execucao, enviados, catalogo)
+        print(f"\n🔍 Conferência: {len(enviados)} enviados, {conferencia['gravados']} gravados, "
+              f"{conferencia['respondidos_com_erro']} com erro na resposta")
+        for marcador, lista in conferencia["duplicados"].items():
+            print(f"  ❌ duplicado: {marcador} → checklists {lista}")
+        for marcador in conferencia["perdidos"]:
+            print(f"  ❌ perdido (303 sem gravação): {marcador}")
+        for marcador, checklist_id, faltando, sem_mapa in conferencia["parciais"]:
+            print(f"  ❌ parcial: {marcador} #{checklist_id} — {faltando} registro(s) faltando"
+                  f"{', sem mapa de operação' if sem_mapa else ''}")
+        inconsistente = conferencia["duplicados"] or conferencia["perdidos"] or conferencia["parciais"]
+        if not inconsistente:
+            print("  ✅ nenhum checklist duplicado, perdido ou parcial")
+
+        if args.limpar:
+            print(f"🧹 {limpar(db, models, f'{args.execucao}-%')} checklists desta execução apagados")
+        return 1 if inconsistente else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
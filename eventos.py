@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+import models
+from database import SessionLocal
+
+# ==========================================================
+# 📡 CANAL DE EVENTOS (SERVER-SENT EVENTS)
+# ==========================================================
+# Cada dashboard conectado recebe uma fila própria. As rotas de gravação
+# publicam pequenos deltas depois do commit e o canal distribui para todas
+# as filas, sem nenhuma consulta ao banco por assinante.
+#
+# Com vários workers (servidor.py define CHECKLIST_WORKERS), o evento é
+# gravado em eventos_painel e cada worker com assinantes lê as linhas novas a
+# cada INTERVALO_LEITURA segundos e entrega às suas filas: o dashboard recebe
+# as gravações feitas em qualquer worker. Com um worker só, a entrega é direta.
+
+INTERVALO_PING = 15          # segundos entre comentários de keep-alive
+TAMANHO_FILA = 100           # eventos pendentes por assinante
+COMPARTILHADO = int(os.getenv("CHECKLIST_WORKERS", "1")) > 1
+INTERVALO_LEITURA = 0.5      # s entre duas leituras de eventos_painel por worker
+RETENCAO = timedelta(minutes=5)
+
+
+class CanalEventos:
+    def __init__(self, tamanho_fila=TAMANHO_FILA, compartilhado=COMPARTILHADO):
+        self.tamanho_fila = tamanho_fila
+        self.compartilhado = compartilhado
+        self._assinantes = set()
+        self._lock = threading.Lock()
+        self._leitor_pid = None
+        self._ultimo_id = None
+        self._podado_em = 0.0
+
+    def assinar(self):
+        assinatura = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.tamanho_fila))
+        with self._lock:
+            self._assinantes.add(assinatura)
+        if self.compartilhado:
+            self._iniciar_leitor()
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinantes.discard(assinatura)
+
+    @property
+    def total_assinantes(self):
+        return len(self._assinantes)
+
+    @property
+    def ativo(self):
+        """Vale a pena montar o evento: há assinantes aqui ou em outro worker."""
+        return self.compartilhado or bool(self._assinantes)
+
+    def publicar(self, evento, dados):
+        """Pode ser chamado tanto do loop (rotas async) quanto do threadpool (rotas def)."""
+        texto = json.dumps(dados, ensure_ascii=False, default=str)
+        if self.compartilhado:
+            with SessionLocal() as db:
+                db.execute(insert(models.EventoPainel).values(evento=evento, dados=texto, criado_em=datetime.now()))
+                db.commit()
+        else:
+            self.entregar(evento, texto)
+
+    def entregar(self, evento, texto):
+        """Distribui para os assinantes deste processo."""
+        mensagem = f"event: {evento}\ndata: {texto}\n\n"
+
+        with self._lock:
+            assinantes = list(self._assinantes)
+
+        for assinatura in assinantes:
+            loop, fila = assinatura
+            try:
+                loop.call_soon_threadsafe(_entregar, fila, mensagem)
+            except RuntimeError:
+                # Loop já encerrado: assinante órfão
+                self.cancelar(assinatura)
+
+    # ---------- leitura de eventos_painel (vários workers) ----------
+    def _iniciar_leitor(self):
+        # Uma thread por processo: depois do fork a do processo pai não existe no filho
+        with self._lock:
+            if self._leitor_pid == os.getpid():
+                return
+            self._leitor_pid = os.getpid()
+            self._ultimo_id = None
+        threading.Thread(target=self._ler, name="eventos-painel", daemon=True).start()
+
+    def _ler(self):
+        while True:
+            time.sleep(INTERVALO_LEITURA)
+            if not self._assinantes:
+                self._ultimo_id = None          # sem ninguém ouvindo: recomeça do fim depois
+                continue
+            try:
+                self._ultimo_id = self.repassar_novos(self._ultimo_id)
+            except Exception as e:
+                print(f"⚠️ Eventos dos outros workers não lidos: {e}")
+
+    def repassar_novos(self, ultimo_id):
+        """Entrega os eventos gravados depois de ultimo_id; devolve o novo último id."""
+        tabela = models.EventoPainel
+        with SessionLocal() as db:
+            if ultimo_id is None:
+                return db.execute(select(func.max(tabela.id))).scalar() or 0
+            linhas = db.execute(
+                select(tabela.id, tabela.evento, tabela.dados).where(tabela.id > ultimo_id).order_by(tabela.id)
+            ).all()
+            for linha in linhas:
+                self.entregar(linha.evento, linha.dados)
+                ultimo_id = linha.id
+
+            if time.monotonic() - self._podado_em > RETENCAO.total_seconds():
+                self._podado_em = time.monotonic()
+                db.execute(delete(tabela).where(tabela.criado_em < datetime.now() - RETENCAO))
+                db.commit()
+        return ultimo_id
+
+    async def fluxo(self, request):
+        assinatura = self.assinar()
+        fila = assinatura[1]
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(fila.get(), timeout=INTERVALO_PING)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    mensagem = ": ping\n\n"
+                yield mensagem
+        finally:
+            self.cancelar(assinatura)
+
+
+def _entregar(fila, mensagem):
+    # Assinante lento: descarta o evento mais antigo em vez de bloquear quem publica
+    if fila.full():
+        fila.get_nowait()
+    fila.put_nowait(mensagem)
+
+
+canal_status = CanalEventos()
+
+
+# ==========================================================
+# 🔢 CONTADORES E DELTAS DE STATUS
+# ==========================================================
+def classificar_status(status):
+    status = (status or "").upper()
+    if status == "OK":
+        return "ok"
+    if status == "NOK":
+        return "nok"
+    if status in ["MANUTENCAO", "MANUTENÇÃO"]:
+        return "man"
+    return None
+
+
+def contadores_status(db):
+    """Totais gerais e por tipo calculados com um único GROUP BY."""
+    linhas = (
+        db.query(models.StatusEquipamento.tipo, models.StatusEquipamento.status, func.count())
+        .group_by(models.StatusEquipamento.tipo, models.StatusEquipamento.status)
+        .order_by(models.StatusEquipamento.tipo.asc())
+        .all()
+    )
+
+    totais = {"ok": 0, "nok": 0, "man": 0}
+    tipos = {}
+    for tipo, status, quantidade in linhas:
+        tipo = tipo or "Sem Tipo"
+        contagem = tipos.setdefault(tipo, {"ok": 0, "nok": 0, "man": 0})
+        classe = classificar_status(status)
+        if classe:
+            contagem[classe] += quantidade
+            totais[classe] += quantidade
+
+    total_geral = totais["ok"] + totais["nok"] + totais["man"]
+    totais["disponibilidade"] = round((totais["ok"] / total_geral) * 100, 1) if total_geral > 0 else 0
+
+    return {"totais": totais, "tipos": tipos}
+
+
+def delta_status(db, equipamentos):
+    return {
+        "equipamentos": [
+            {
+                "id": e.id,
+                "nome": e.nome_equipamento,
+                "tipo": e.tipo,
+                "status": e.status,
+                "tecnico": e.tecnico,
+            }
+            for e in equipamentos
+        ],
+        **contadores_status(db),
+    }
+
+
+def publicar_status(db, equipamento_ids):
+    if canal_status.ativo:
+        equipamentos = (
+            db.query(models.StatusEquipamento)
+            .filter(models.StatusEquipamento.id.in_(equipamento_ids))
+            .all()
+        )
+        canal_status.publicar("status", delta_status(db, equipamentos))
+
+
+def publicar_checklist(checklist, local):
+    if canal_status.ativo:
+        canal_status.publicar("checklist", {
+            "checklist_id": checklist.id,
+            "tecnico": checklist.tecnico,
+            "turno": checklist.turno,
+            "local": local,
+            "data": checklist.data_criacao.strftime("%d/%m/%Y %H:%M") if checklist.data_criacao else None,
+        })
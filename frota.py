@@ -0,0 +1,206 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+# ==========================================================
+# 🏭 FROTA DE EQUIPAMENTOS DO CHECKLIST
+# ==========================================================
+# Fonte única para o formulário (checkboxes), o parser do POST, a tela de
+# detalhes e o PDF. Para incluir equipamentos basta ajustar a quantidade;
+# para um tipo novo, acrescentar uma linha (a chave não pode mudar depois,
+# pois é ela que identifica o tipo nos mapas já gravados).
+
+TipoEquipamento = namedtuple("TipoEquipamento", "chave tipo titulo rotulo quantidade")
+
+FROTA = [
+    TipoEquipamento("torre", "Torre", "Torres", "Torre", 12),
+    TipoEquipamento("bac", "BAC", "Bombas de Resfriamento", "BAC", 10),
+    TipoEquipamento("bag", "BAG", "Bombas Água Gelada", "BAG", 9),
+    TipoEquipamento("cp", "Compressor", "Compressores", "CP", 7),
+    TipoEquipamento("chiller", "Chiller", "Chillers", "Chiller", 9),
+    TipoEquipamento("secador", "Secador", "Secadores", "Secador", 3),
+]
+
+POR_CHAVE = {t.chave: t for t in FROTA}
+
+# Prefixos usados nos nomes gravados em status_operacao_checklist (formato antigo)
+_CHAVE_LEGADO = {
+    "torre": "torre", "bac": "bac", "bag": "bag", "cp": "cp",
+    "compressor": "cp", "chiller": "chiller", "secador": "secador",
+}
+
+
+# ==========================================================
+# 🔢 MAPA DE BITS: UM INTEIRO POR TIPO
+# ==========================================================
+# O bit (n - 1) indica que o equipamento n estava operando. O mapa é gravado
+# como texto compacto "torre:a3f,bac:1f" (hexadecimal), sem os tipos zerados.
+
+def ler_formulario(form):
+    mascaras = {}
+    for t in FROTA:
+        mascara = 0
+        for numero in range(1, t.quantidade + 1):
+            if form.get(f"{t.chave}_{numero}") is not None:
+                mascara |= 1 << (numero - 1)
+        mascaras[t.chave] = mascara
+    return mascaras
+
+
+def codificar(mascaras):
+    return ",".join(f"{chave}:{mascara:x}" for chave, mascara in mascaras.items() if mascara)
+
+
+def decodificar(mapa):
+    mascaras = {t.chave: 0 for t in FROTA}
+    for parte in (mapa or "").split(","):
+        if ":" in parte:
+            chave, valor = parte.split(":", 1)
+            mascaras[chave] = int(valor, 16)
+    return mascaras
+
+
+def numeros(mascara):
+    return [bit + 1 for bit in range(mascara.bit_length()) if mascara >> bit & 1]
+
+
+def nome_legado(t, numero):
+    # Mesmo nome que o salvar_main antigo gravava: chave do campo + número ("Cp 03", "Bac 01")
+    return f"{t.chave.capitalize()} {numero:02d}"
+
+
+def equipamentos_operando(mapa):
+    """Lista no mesmo formato das linhas antigas (nome_equipamento, tipo), para telas e PDF.
+
+    Os nomes são os do formato antigo ("Cp 03", tipo "Compressor"), para que
+    checklists novos e convertidos apareçam iguais aos gravados antes do mapa.
+    """
+    lista = []
+    for chave, mascara in decodificar(mapa).items():
+        t = POR_CHAVE.get(chave)
+        if t is None:
+            continue
+        for numero in numeros(mascara):
+            lista.append(SimpleNamespace(nome_equipamento=nome_legado(t, numero), tipo=t.tipo))
+    return lista
+
+
+def equipamento_legado(nome):
+    """(chave, número) de um nome antigo ("Cp 03"), ou None se não for um equipamento da FROTA."""
+    partes = (nome or "").split()
+    if len(partes) < 2 or not partes[-1].isdigit():
+        return None
+    chave = _CHAVE_LEGADO.get(partes[0].lower())
+    numero = int(partes[-1])
+    if chave is None or not 1 <= numero <= POR_CHAVE[chave].quantidade:
+        return None
+    return chave, numero
+
+
+def mascaras_de_legado(operacoes, invalidos=None):
+    """Converte linhas antigas de status_operacao_checklist ("Cp 03", "Torre 12"...) em máscaras.
+
+    Nomes fora da frota ("Torre 00", sem número, tipo desconhecido) são
+    ignorados e, se invalidos for uma lista, anotados nela.
+    """
+    mascaras = {t.chave: 0 for t in FROTA}
+    for op in operacoes:
+        equipamento = equipamento_legado(op.nome_equipamento)
+        if equipamento is None:
+            if invalidos is not None:
+                invalidos.append(op.nome_equipamento)
+            continue
+        chave, numero = equipamento
+        mascaras[chave] |= 1 << (numero - 1)
+    return mascaras
+
+
+def _avisar_invalidos(checklist_id, invalidos):
+    if invalidos:
+        print(f"⚠️ Checklist #{checklist_id}: equipamentos fora da frota ignorados: {', '.join(map(repr, invalidos))}")
+
+
+# ==========================================================
+# 🔄 CONVERSÃO DOS CHECKLISTS ANTIGOS: python frota.py
+# ==========================================================
+def converter_legado(db, lote=500):
+    """Troca as linhas de status_operacao_checklist (tabela quente) por um mapa por checklist."""
+    import models
+
+    total = 0
+    while True:
+        ids = [
+            linha[0] for linha in
+            db.query(models.StatusOperacaoChecklist.checklist_id)
+            .distinct()
+            .order_by(models.StatusOperacaoChecklist.checklist_id)
+            .limit(lote)
+        ]
+        if not ids:
+            return total
+
+        operacoes = (
+            db.query(models.StatusOperacaoChecklist)
+            .filter(models.StatusOperacaoChecklist.checklist_id.in_(ids))
+            .all()
+        )
+        por_checklist = {}
+        for op in operacoes:
+            por_checklist.setdefault(op.checklist_id, []).append(op)
+
+        existentes = {
+            linha[0] for linha in
+            db.query(models.OperacaoChecklist.checklist_id)
+            .filter(models.OperacaoChecklist.checklist_id.in_(ids))
+        }
+        for checklist_id, linhas in por_checklist.items():
+            if checklist_id not in existentes:
+                invalidos = []
+                db.add(models.OperacaoChecklist(
+                    checklist_id=checklist_id,
+                    mapa=codificar(mascaras_de_legado(linhas, invalidos))
+                ))
+                _avisar_invalidos(checklist_id, invalidos)
+
+        db.query(models.StatusOperacaoChecklist).filter(
+            models.StatusOperacaoChecklist.checklist_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        total += len(ids)
+
+
+def converter_arquivados(db):
+    """Cria o mapa dos checklists arquivados com equipamentos no formato antigo."""
+    import arquivo
+    import models
+
+    ids = [
+        linha[0] for linha in
+        db.query(models.ChecklistArquivo.checklist_id)
+        .outerjoin(models.OperacaoChecklist,
+                   models.OperacaoChecklist.checklist_id == models.ChecklistArquivo.checklist_id)
+        .filter(models.ChecklistArquivo.total_operacoes > 0, models.OperacaoChecklist.checklist_id.is_(None))
+    ]
+    for n, checklist_id in enumerate(ids, 1):
+        _, operacoes = arquivo.descompactar(db.get(models.ChecklistArquivo, checklist_id).dados)
+        invalidos = []
+        db.add(models.OperacaoChecklist(checklist_id=checklist_id, mapa=codificar(mascaras_de_legado(operacoes, invalidos))))
+        _avisar_invalidos(checklist_id, invalidos)
+        if n % 500 == 0:
+            db.commit()
+            db.expunge_all()
+    db.commit()
+    return len(ids)
+
+
+if __name__ == "__main__":
+    import models
+    from database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        total = converter_legado(db)
+        arquivados = converter_arquivados(db)
+        print(f"✅ {total} checklists ({arquivados} arquivados) convertidos para o mapa de equipamentos.")
+    finally:
+        db.close()
@@ -0,0 +1,73 @@
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+# ==========================================================
+# 🔑 ENVIO ÚNICO DO CHECKLIST (CHAVE DE IDEMPOTÊNCIA)
+# ==========================================================
+# O formulário leva uma chave gerada quando a página é montada (campo oculto
+# chave_envio). Wi-Fi instável faz o técnico reenviar o mesmo formulário: a
+# primeira gravação registra a chave na mesma transação do checklist e os
+# reenvios recebem o resultado original, sem gravar nada em itens_registro.
+# Formulários sem chave (páginas antigas em cache) são gravados como antes.
+
+VALIDADE = timedelta(hours=int(os.getenv("CHECKLIST_IDEMPOTENCIA_HORAS", "24")))
+INTERVALO_PODA = 600                   # s entre duas limpezas das chaves vencidas
+_CHAVE_VALIDA = re.compile(r"^[\w-]{8,64}$")
+_ultima_poda = {"em": 0.0}
+
+
+def nova_chave():
+    return uuid.uuid4().hex
+
+
+def chave_do_formulario(form):
+    chave = (form.get("chave_envio") or "").strip()
+    return chave if _CHAVE_VALIDA.match(chave) else None
+
+
+def ja_processado(db, chave):
+    """Checklist gravado por um envio anterior com a mesma chave, ou None."""
+    if not chave:
+        return None
+    registro = db.get(models.ChaveIdempotencia, chave)
+    return registro.checklist_id if registro is not None else None
+
+
+def reservar(db, chave, checklist):
+    """Grava a chave junto com o checklist (ainda não confirmado).
+
+    Devolve False quando outro envio com a mesma chave chegou primeiro: a
+    transação é desfeita e nada mais deve ser gravado. Um envio concorrente com
+    a mesma chave espera aqui até o primeiro terminar.
+    """
+    if not chave:
+        return True
+    db.add(models.ChaveIdempotencia(
+        chave=chave,
+        checklist_id=checklist.id,
+        expira_em=datetime.now() + VALIDADE,
+    ))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def podar(db):
+    """Apaga chaves vencidas, no máximo uma vez a cada INTERVALO_PODA por processo."""
+    agora = time.monotonic()
+    if agora - _ultima_poda["em"] < INTERVALO_PODA:
+        return
+    _ultima_poda["em"] = agora
+    db.execute(delete(models.ChaveIdempotencia).where(models.ChaveIdempotencia.expira_em < datetime.now()))
+    db.commit()
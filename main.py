@@ -1,16 +1,32 @@
 import sys, os
+import zlib
 from datetime import datetime, timezone, timedelta
 from urllib.parse import unquote
 from io import BytesIO
+from typing import List, Optional
 
-from fastapi import FastAPI, Request, Form, Depends, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from fastapi import FastAPI, Request, Form, Depends, Query, Body
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+from sqlalchemy import text, update
 from sqlalchemy.orm import Session
 from weasyprint import HTML
 
+import analise
+import arquivo
+import busca
+import eventos
+import frota
+import idempotencia
+import migracao_modelos
 import models
+import modelos
+import perfil
+import replica
+import series
+import sincronizacao
 from database import SessionLocal, engine
 
 sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -31,7 +47,19 @@ static_dir = os.path.join(BASE_DIR, "static")
 # 🔧 CONFIGURAÇÃO GERAL
 # ==========================================================
 app = FastAPI()
+app.router.route_class = perfil.RotaPerfilada
+app.add_middleware(perfil.PerfilMiddleware)
+app.add_middleware(replica.FixarPrincipalMiddleware)
 models.Base.metadata.create_all(bind=engine)
+migracao_modelos.verificar_esquema()
+
+# 🔹 Estação que envia suas alterações para a central (ver sincronizacao.py)
+if sincronizacao.REGISTRAR:
+    sincronizacao.ativar_registro(SessionLocal)
+
+# 🔹 Réplica de leitura: pulso no principal para medir o atraso (ver replica.py)
+if replica.ATIVA:
+    replica.iniciar_pulso()
 
 # 🔹 Monta diretórios de templates e estáticos
 if os.path.exists(static_dir):
@@ -40,6 +68,7 @@ else:
     print(f"⚠️ Pasta 'static' não encontrada em {static_dir}")
 
 templates = Jinja2Templates(directory=templates_dir)
+perfil.instalar(templates)
 brasil_tz = timezone(timedelta(hours=-3))
 
 # ==========================================================
@@ -52,12 +81,20 @@ def get_db():
     finally:
         db.close()
 
+# 🔹 Telas só de leitura: réplica quando configurada e em dia; senão o principal
+def get_db_leitura(request: Request):
+    db = replica.sessao_leitura(request.cookies.get(replica.COOKIE))
+    try:
+        yield db
+    finally:
+        db.close()
+
 # ==========================================================
 # ==========================================================
 # 📋 CHECKLIST (FORMULÁRIO PRINCIPAL)
 # ==========================================================
 @app.get("/", response_class=HTMLResponse)
-def checklist_form(request: Request, db: Session = Depends(get_db)):
+def checklist_form(request: Request, db: Session = Depends(get_db_leitura)):
     
     itens = db.query(models.ItemChecklist).all()
     grupos_main = {}
@@ -127,7 +164,9 @@ def checklist_form(request: Request, db: Session = Depends(get_db)):
     return templates.TemplateResponse("checklist.html", {
         "request": request,
         "grupos_main": grupos_main,
-        "grupos_supplier": grupos_supplier
+        "grupos_supplier": grupos_supplier,
+        "frota": frota.FROTA,
+        "chave_envio": idempotencia.nova_chave()
     })
 
 
@@ -153,6 +192,7 @@ async def salvar_checklist(request: Request, db: Session = Depends(get_db)):
     db.refresh(checklist)
 
     todos_itens = db.query(models.ItemChecklist).all()
+    versoes = modelos.modelos_vigentes(db, todos_itens)
 
     for item in todos_itens:
         valor_raw = form.get(f"valor_{item.id}")
@@ -171,11 +211,7 @@ async def salvar_checklist(request: Request, db: Session = Depends(get_db)):
 
         registro = models.ItemRegistro(
             checklist_id=checklist.id,
-            sistema=item.sistema,
-            descricao=item.descricao,
-            unidade=item.unidade,
-            valor_min=item.valor_min,
-            valor_max=item.valor_max,
+            modelo_id=versoes[item.id],
             valor_registrado=valor,
             status_ok=status_ok,
             comentario=comentario
@@ -183,17 +219,49 @@ async def salvar_checklist(request: Request, db: Session = Depends(get_db)):
         db.add(registro)
 
     db.commit()
+    eventos.publicar_checklist(checklist, None)
     return RedirectResponse(url="/", status_code=303)
 
 
 # ==========================================================
 # 💾 SALVAR CHECKLIST PARCIAL (MAIN / SUPPLIER)
 # ==========================================================
+def _envio_repetido(chave, checklist_id, local):
+    # Mesmo resultado do primeiro envio: volta para o formulário
+    print(f"↩️ Checklist {local.upper()} reenviado (chave {chave}): mantido o #{checklist_id}")
+    return RedirectResponse(url="/", status_code=303)
+
+
 @app.post("/salvar_main")
 async def salvar_main(request: Request, db: Session = Depends(get_db)):
     form = await request.form()
     # print("Checklist MAIN PLANT recebido.")
 
+    # 🔑 Reenvio do mesmo formulário: devolve o resultado original sem gravar
+    chave = idempotencia.chave_do_formulario(form)
+    original = idempotencia.ja_processado(db, chave)
+    if original:
+        return _envio_repetido(chave, original, "main")
+
+    # ==========================================================
+    # 📚 ITENS DO CHECKLIST NORMAL (Main Plant) E VERSÕES VIGENTES
+    # ==========================================================
+    # Resolvidos antes de qualquer escrita: o checklist inteiro é gravado numa
+    # única transação (nunca fica checklist sem itens)
+    sistemas_main = [
+        "Ar Comprimido",
+        "Água de Resfriamento",
+        "Água Gelada",
+        "Climatizacao_f",
+        "Climatizacao_m",
+        "Climatizacao_c"
+    ]
+
+    todos_itens = db.query(models.ItemChecklist).filter(
+        models.ItemChecklist.sistema.in_(sistemas_main)
+    ).all()
+    versoes = modelos.modelos_vigentes(db, todos_itens)
+
     # ==========================================================
     # 💾 CRIA CHECKLIST PRINCIPAL
     # ==========================================================
@@ -207,61 +275,24 @@ async def salvar_main(request: Request, db: Session = Depends(get_db)):
         data_criacao=datetime.now()
     )
     db.add(checklist)
-    db.commit()
-    db.refresh(checklist)
+    db.flush()
+    if not idempotencia.reservar(db, chave, checklist):
+        # O envio concorrente já confirmou: o checklist dele é o que vale
+        return _envio_repetido(chave, idempotencia.ja_processado(db, chave), "main")
 
     # ==========================================================
     # ⚙️ SALVAR EQUIPAMENTOS OPERANDO (CHECKBOXES)
     # ==========================================================
-    for nome_campo in form.keys():
-        if nome_campo.startswith(("torre_", "bac_", "bag_", "cp_", "chiller_")):
-            try:
-                # Extrai prefixo e número (ex: torre_1 → Torre 01)
-                prefixo, numero = nome_campo.split("_", 1)
-                numero_formatado = f"{int(numero):02d}"
-                nome_eq = f"{prefixo.capitalize()} {numero_formatado}"
-
-                # Define tipo do equipamento
-                tipo_eq = (
-                    "Torre" if "torre" in nome_campo else
-                    "BAC" if "bac" in nome_campo else
-                    "BAG" if "bag" in nome_campo else
-                    "Compressor" if "cp" in nome_campo else
-                    "Chiller"
-                )
-
-                # Cria o registro
-                status_op = models.StatusOperacaoChecklist(
-                    checklist_id=checklist.id,
-                    nome_equipamento=nome_eq,
-                    tipo=tipo_eq,
-                    status="Operando",
-                    tecnico=form.get("tecnico"),
-                    turno=form.get("turno"),
-                    data_registro=datetime.now()
-                )
-                db.add(status_op)
-
-            except Exception as e:
-                print(f"⚠️ Erro ao processar {nome_campo}: {e}")
-                continue
+    # Um mapa de bits por tipo da frota (frota.FROTA), numa única linha
+    mascaras = frota.ler_formulario(form)
+    db.add(models.OperacaoChecklist(
+        checklist_id=checklist.id,
+        mapa=frota.codificar(mascaras)
+    ))
 
     # ==========================================================
     # 🔹 SALVAR ITENS DO CHECKLIST NORMAL (Main Plant)
     # ==========================================================
-    sistemas_main = [
-        "Ar Comprimido",
-        "Água de Resfriamento",
-        "Água Gelada",
-        "Climatizacao_f",
-        "Climatizacao_m",
-        "Climatizacao_c"
-    ]
-
-    todos_itens = db.query(models.ItemChecklist).filter(
-        models.ItemChecklist.sistema.in_(sistemas_main)
-    ).all()
-
     for item in todos_itens:
         valor_raw = form.get(f"valor_{item.id}")
 
@@ -281,11 +312,7 @@ async def salvar_main(request: Request, db: Session = Depends(get_db)):
 
         registro = models.ItemRegistro(
             checklist_id=checklist.id,
-            sistema=item.sistema,
-            descricao=item.descricao,
-            unidade=item.unidade,
-            valor_min=item.valor_min,
-            valor_max=item.valor_max,
+            modelo_id=versoes[item.id],
             valor_registrado=valor,
             status_ok=status_ok,
             comentario=comentario
@@ -296,6 +323,8 @@ async def salvar_main(request: Request, db: Session = Depends(get_db)):
     # 💾 FINALIZA E REDIRECIONA
     # ==========================================================
     db.commit()
+    eventos.publicar_checklist(checklist, "main")
+    idempotencia.podar(db)
     print(f"✅ Checklist MAIN #{checklist.id} salvo com sucesso.")
     return RedirectResponse(url="/", status_code=303)
 
@@ -305,6 +334,20 @@ async def salvar_supplier(request: Request, db: Session = Depends(get_db)):
     form = await request.form()
     #print("Checklist SUPPLIER PARK recebido.")
 
+    chave = idempotencia.chave_do_formulario(form)
+    original = idempotencia.ja_processado(db, chave)
+    if original:
+        return _envio_repetido(chave, original, "supplier")
+
+    # ✅ Use os nomes reais do banco
+    sistemas_supplier = ["denso", "mmh", "pmc", "tiberina", "revest","adler","psmm","fmm"]
+
+    # Itens e versões antes de qualquer escrita (checklist gravado numa transação só)
+    todos_itens = db.query(models.ItemChecklist).filter(
+        models.ItemChecklist.sistema.in_(sistemas_supplier)
+    ).all()
+    versoes = modelos.modelos_vigentes(db, todos_itens)
+
     checklist = models.Checklist(
         tecnico=form.get("tecnico"),
         especialidade_tecnico=form.get("especialidade_tecnico"),
@@ -315,15 +358,10 @@ async def salvar_supplier(request: Request, db: Session = Depends(get_db)):
         data_criacao=datetime.now()
     )
     db.add(checklist)
-    db.commit()
-    db.refresh(checklist)
-
-    # ✅ Use os nomes reais do banco
-    sistemas_supplier = ["denso", "mmh", "pmc", "tiberina", "revest","adler","psmm","fmm"]
-
-    todos_itens = db.query(models.ItemChecklist).filter(
-        models.ItemChecklist.sistema.in_(sistemas_supplier)
-    ).all()
+    db.flush()
+    if not idempotencia.reservar(db, chave, checklist):
+        # O envio concorrente já confirmou: o checklist dele é o que vale
+        return _envio_repetido(chave, idempotencia.ja_processado(db, chave), "supplier")
 
     for item in todos_itens:
         valor_raw = form.get(f"valor_{item.id}")
@@ -336,11 +374,7 @@ async def salvar_supplier(request: Request, db: Session = Depends(get_db)):
 
         registro = models.ItemRegistro(
             checklist_id=checklist.id,
-            sistema=item.sistema,  # ← usa exatamente o nome do banco
-            descricao=item.descricao,
-            unidade=item.unidade,
-            valor_min=item.valor_min,
-            valor_max=item.valor_max,
+            modelo_id=versoes[item.id],  # ← versão vigente do item no catálogo
             valor_registrado=valor,
             status_ok=status_ok,
             comentario=comentario
@@ -348,25 +382,20 @@ async def salvar_supplier(request: Request, db: Session = Depends(get_db)):
         db.add(registro)
 
     db.commit()
+    eventos.publicar_checklist(checklist, "supplier")
+    idempotencia.podar(db)
     #print(f"✅ Checklist Supplier salvo com {len(todos_itens)} itens.")
     return RedirectResponse(url="/", status_code=303)
 
 # 📊 HISTÓRICO DE CHECKLISTS
 @app.get("/historico_checklist", response_class=HTMLResponse)
-def historico_checklist(request: Request, db: Session = Depends(get_db)):
+def historico_checklist(request: Request, db: Session = Depends(get_db_leitura)):
     checklists = db.query(models.Checklist).order_by(models.Checklist.data_criacao.desc()).all()
 
-    # Lista real de sistemas Supplier no banco
-    sistemas_supplier = ["denso", "mmh", "pmc", "tiberina", "revest","adler","psmm","fmm"]
-
+    # Main/Supplier de todos os checklists (inclusive arquivados) de uma vez
+    locais = arquivo.locais_checklists(db, [c.id for c in checklists])
     for c in checklists:
-        # Procura qualquer item do checklist que pertença a um supplier
-        tem_supplier = db.query(models.ItemRegistro).filter(
-            models.ItemRegistro.checklist_id == c.id,
-            models.ItemRegistro.sistema.in_(sistemas_supplier)
-        ).first()
-
-        c.local = "supplier" if tem_supplier else "main"
+        c.local = locais[c.id]
 
     return templates.TemplateResponse(
         "historico_checklist.html",
@@ -379,32 +408,26 @@ def historico_checklist(request: Request, db: Session = Depends(get_db)):
 # 📄 DETALHES DE UM CHECKLIST
 # ==========================================================
 @app.get("/checklist/{checklist_id}", response_class=HTMLResponse)
-def detalhes_checklist(request: Request, checklist_id: int, db: Session = Depends(get_db)):
+def detalhes_checklist(request: Request, checklist_id: int, db: Session = Depends(get_db_leitura)):
 
     checklist = db.query(models.Checklist).filter(models.Checklist.id == checklist_id).first()
     if not checklist:
         return HTMLResponse("Checklist não encontrado", status_code=404)
 
     # ---------------------------------------------------------
-    # TIPO DO CHECKLIST
+    # ITENS E EQUIPAMENTOS OPERANDO (TABELA QUENTE OU ARQUIVO)
     # ---------------------------------------------------------
-    sistemas_supplier = ["denso", "mmh", "pmc", "tiberina", "revest","adler","psmm","fmm"]
-    tem_supplier = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema.in_(sistemas_supplier)
-    ).first()
+    registros, equipamentos_operando = arquivo.carregar_checklist(db, checklist_id)
 
-    tipo_checklist = "supplier" if tem_supplier else "main"
+    # ---------------------------------------------------------
+    # TIPO DO CHECKLIST
+    # ---------------------------------------------------------
+    tipo_checklist = arquivo.local_do_checklist(registros)
 
     # ---------------------------------------------------------
-    # CARREGA STATUS E EQUIPAMENTOS OPERANDO
+    # CARREGA STATUS DOS EQUIPAMENTOS
     # ---------------------------------------------------------
     status_equipamentos = db.query(models.StatusEquipamento).all()
-    equipamentos_operando = db.query(models.StatusOperacaoChecklist).filter(
-        models.StatusOperacaoChecklist.checklist_id == checklist_id
-    ).all()
-
-    nomes_operando = {e.nome_equipamento.strip() for e in equipamentos_operando}
 
     # ---------------------------------------------------------
     # NORMALIZAÇÃO
@@ -454,86 +477,30 @@ def detalhes_checklist(request: Request, checklist_id: int, db: Session = Depend
 
         return sorted(lista, key=lambda x: int(x.nome_padronizado.split()[-1]))
 
-    torres = gerar_lista("Torre")
-    bac = gerar_lista("BAC")
-    bag = gerar_lista("BAG")
-    comp = gerar_lista("Compressor")
-    chillers = gerar_lista("Chiller")
-    secadores = gerar_lista("Secador")
-
+    grupos_equipamentos = [(t.titulo, gerar_lista(t.tipo)) for t in frota.FROTA]
 
     # ---------------------------------------------------------
-    # ITENS DO CHECKLIST (mantido)
+    # ITENS DO CHECKLIST AGRUPADOS POR SISTEMA
     # ---------------------------------------------------------
-    itens_ar = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Ar Comprimido"
-    ).all()
-
-    itens_agua_resfriamento = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Água de Resfriamento"
-    ).all()
-
-    itens_agua_gelada = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Água Gelada"
-    ).all()
-
-    itens_funilaria_climatizacao = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Climatizacao_f"
-    ).all()
-
-    itens_montagem_climatizacao = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Climatizacao_m"
-    ).all()
-
-    itens_communication_climatizacao = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "Climatizacao_c"
-    ).all()
-
-    itens_denso = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "denso"
-    ).all()
-
-    itens_mmh = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "mmh"
-    ).all()
-
-    itens_pmc = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "pmc"
-    ).all()
-
-    itens_tiberina = db.query(models.ItemRegistro).filter(    
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "tiberina"
-    ).all()
-
-    itens_revest = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "revest"
-    ).all()
-
-    itens_adler = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "adler"
-    ).all()
-
-    itens_psmm = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "psmm"
-    ).all()
-
-    itens_fmm = db.query(models.ItemRegistro).filter(
-        models.ItemRegistro.checklist_id == checklist_id,
-        models.ItemRegistro.sistema == "fmm"
-    ).all()
+    por_sistema = {}
+    for registro in registros:
+        por_sistema.setdefault(registro.sistema, []).append(registro)
+
+    itens_ar = por_sistema.get("Ar Comprimido", [])
+    itens_agua_resfriamento = por_sistema.get("Água de Resfriamento", [])
+    itens_agua_gelada = por_sistema.get("Água Gelada", [])
+    itens_funilaria_climatizacao = por_sistema.get("Climatizacao_f", [])
+    itens_montagem_climatizacao = por_sistema.get("Climatizacao_m", [])
+    itens_communication_climatizacao = por_sistema.get("Climatizacao_c", [])
+
+    itens_denso = por_sistema.get("denso", [])
+    itens_mmh = por_sistema.get("mmh", [])
+    itens_pmc = por_sistema.get("pmc", [])
+    itens_tiberina = por_sistema.get("tiberina", [])
+    itens_revest = por_sistema.get("revest", [])
+    itens_adler = por_sistema.get("adler", [])
+    itens_psmm = por_sistema.get("psmm", [])
+    itens_fmm = por_sistema.get("fmm", [])
 
     # ---------------------------------------------------------
     # ENVIA AO TEMPLATE
@@ -543,12 +510,7 @@ def detalhes_checklist(request: Request, checklist_id: int, db: Session = Depend
         "checklist": checklist,
         "tipo_checklist": tipo_checklist,
 
-        "torres": torres,
-        "bac": bac,
-        "bag": bag,
-        "comp": comp,
-        "chillers": chillers,
-        "secadores": secadores, 
+        "grupos_equipamentos": grupos_equipamentos,
 
         "itens_ar": itens_ar,
         "itens_agua_resfriamento": itens_agua_resfriamento,
@@ -571,27 +533,15 @@ def detalhes_checklist(request: Request, checklist_id: int, db: Session = Depend
 # 📊 DASHBOARD DE STATUS DOS EQUIPAMENTOS
 # ==========================================================
 @app.get("/dashboard_equipamentos", response_class=HTMLResponse)
-def dashboard_equipamentos(request: Request, db: Session = Depends(get_db)):
-    equipamentos = db.query(models.StatusEquipamento).order_by(models.StatusEquipamento.tipo.asc()).all()
+def dashboard_equipamentos(request: Request, db: Session = Depends(get_db_leitura)):
+    contadores = eventos.contadores_status(db)
+    totais = contadores["totais"]
+    tipos = contadores["tipos"]
 
-    total_ok = sum(1 for e in equipamentos if e.status.upper() == "OK")
-    total_nok = sum(1 for e in equipamentos if e.status.upper() == "NOK")
-    total_man = sum(1 for e in equipamentos if e.status.upper() in ["MANUTENCAO", "MANUTENÇÃO"])
-
-    total_geral = total_ok + total_nok + total_man
-    disponibilidade = round((total_ok / total_geral) * 100, 1) if total_geral > 0 else 0
-
-    tipos = {}
-    for e in equipamentos:
-        tipo = e.tipo or "Sem Tipo"
-        if tipo not in tipos:
-            tipos[tipo] = {"ok": 0, "nok": 0, "man": 0}
-        if e.status.upper() == "OK":
-            tipos[tipo]["ok"] += 1
-        elif e.status.upper() == "NOK":
-            tipos[tipo]["nok"] += 1
-        elif e.status.upper() in ["MANUTENCAO", "MANUTENÇÃO"]:
-            tipos[tipo]["man"] += 1
+    total_ok = totais["ok"]
+    total_nok = totais["nok"]
+    total_man = totais["man"]
+    disponibilidade = totais["disponibilidade"]
 
     labels = list(tipos.keys())
     valores_ok = [v["ok"] for v in tipos.values()]
@@ -610,13 +560,24 @@ def dashboard_equipamentos(request: Request, db: Session = Depends(get_db)):
         "valores_man": valores_man
     })
 
+# ==========================================================
+# 📡 EVENTOS AO VIVO PARA OS DASHBOARDS (SSE)
+# ==========================================================
+@app.get("/eventos/status")
+async def eventos_status(request: Request):
+    return StreamingResponse(
+        eventos.canal_status.fluxo(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ==========================================================
 # 📜 HISTÓRICO DE STATUS (COM PAGINAÇÃO)
 # ==========================================================
 @app.get("/historico", response_class=HTMLResponse)
 async def historico_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_leitura),
     equipamento_id: int = Query(None),
     tecnico: str = Query(None),
     tipo: str = Query(None),
@@ -664,8 +625,105 @@ async def historico_page(
         "total_registros": total_registros
     })
 
+# ==========================================================
+# 🔎 BUSCA TEXTUAL EM COMENTÁRIOS E OBSERVAÇÕES
+# ==========================================================
+@app.get("/busca")
+def busca_textual(
+    q: str = Query(..., min_length=2),
+    data_inicial: str = Query(None),
+    data_final: str = Query(None),
+    sistema: str = Query(None),
+    equipamento_id: int = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db_leitura)
+):
+    try:
+        data_i = datetime.strptime(data_inicial, "%Y-%m-%d") if data_inicial else None
+        data_f = datetime.strptime(data_final, "%Y-%m-%d") + timedelta(days=1) if data_final else None
+    except ValueError:
+        return JSONResponse({"erro": "Datas devem estar no formato AAAA-MM-DD."}, status_code=400)
+
+    resultados = busca.buscar(
+        db, q,
+        data_inicial=data_i,
+        data_final=data_f,
+        sistema=sistema,
+        equipamento_id=equipamento_id,
+        limite=limit
+    )
+    return {"q": q, "total": len(resultados), "resultados": resultados}
+
+# ==========================================================
+# 📈 HEATMAP DE OPERAÇÃO DOS EQUIPAMENTOS (JSON PARA GRÁFICO)
+# ==========================================================
+@app.get("/api/operacao/heatmap")
+def heatmap_operacao(
+    data_inicial: str = Query(None),
+    data_final: str = Query(None),
+    agrupar: str = Query("checklist", pattern="^(checklist|turno)$"),
+    tipo: List[str] = Query(None),
+    db: Session = Depends(get_db_leitura)
+):
+    try:
+        data_f = datetime.strptime(data_final, "%Y-%m-%d") + timedelta(days=1) if data_final else \
+            datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=1)
+        data_i = datetime.strptime(data_inicial, "%Y-%m-%d") if data_inicial else data_f - timedelta(days=90)
+    except ValueError:
+        return JSONResponse({"erro": "Datas devem estar no formato AAAA-MM-DD."}, status_code=400)
+
+    resultado = analise.heatmap_operacao(db, data_i, data_f, agrupar=agrupar, chaves=tipo)
+    resultado["periodo"] = {
+        "inicio": data_i.strftime("%Y-%m-%d"),
+        "fim": (data_f - timedelta(days=1)).strftime("%Y-%m-%d"),
+    }
+    # Já são tipos nativos do Python: evita o jsonable_encoder nas listas grandes
+    return JSONResponse(resultado)
+
+# ==========================================================
+# 📉 SÉRIE DE LEITURAS DE UM ITEM (REDUZIDA PARA GRÁFICO)
+# ==========================================================
+@app.get("/api/series")
+def serie_leituras(
+    item_id: int = Query(...),
+    data_inicial: str = Query(None),
+    data_final: str = Query(None),
+    pontos: int = Query(500, ge=10, le=5000),
+    db: Session = Depends(get_db_leitura)
+):
+    item = db.get(models.ItemChecklist, item_id)
+    if not item:
+        return JSONResponse({"erro": "Item não encontrado."}, status_code=404)
+
+    try:
+        data_f = datetime.strptime(data_final, "%Y-%m-%d") + timedelta(days=1) if data_final else \
+            datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=1)
+        data_i = datetime.strptime(data_inicial, "%Y-%m-%d") if data_inicial else data_f - timedelta(days=365)
+    except ValueError:
+        return JSONResponse({"erro": "Datas devem estar no formato AAAA-MM-DD."}, status_code=400)
+
+    resultado = series.serie_item(db, item_id, data_i, data_f, pontos=pontos)
+    resultado["item"] = {
+        "id": item.id,
+        "sistema": item.sistema,
+        "descricao": item.descricao,
+        "unidade": item.unidade,
+        "valor_min": item.valor_min,
+        "valor_max": item.valor_max,
+    }
+    resultado["periodo"] = {
+        "inicio": data_i.strftime("%Y-%m-%d"),
+        "fim": (data_f - timedelta(days=1)).strftime("%Y-%m-%d"),
+    }
+    return JSONResponse(resultado)
+
 # ==========================================================
 # ⚙️ # ==========================================================
+def ordem_natural(equipamento):
+    numero = (equipamento.nome_equipamento or "").split()[-1:]
+    return (int(numero[0]) if numero and numero[0].isdigit() else 0, equipamento.nome_equipamento or "")
+
+
 @app.get("/atualizar_status", response_class=HTMLResponse)
 async def atualizar_status_get(request: Request, db: Session = Depends(get_db), tipo: str = None):
     if not tipo:
@@ -675,13 +733,9 @@ async def atualizar_status_get(request: Request, db: Session = Depends(get_db),
     if tipo != "Todos":
         query = query.filter(models.StatusEquipamento.tipo == tipo)
 
-    from sqlalchemy import func, cast, Integer
-
-    equipamentos = (
-    query.order_by(
-        cast(func.substring_index(models.StatusEquipamento.nome_equipamento, ' ', -1), Integer)
-    ).all()
-)
+    # Ordem natural pelo número no fim do nome ("Torre 2" antes de "Torre 10"),
+    # feita em Python para funcionar no MySQL e no SQLite
+    equipamentos = sorted(query.all(), key=ordem_natural)
 
     tipos = sorted([t[0] for t in db.query(models.StatusEquipamento.tipo).distinct().all()])
 
@@ -716,15 +770,144 @@ async def atualizar_status(request: Request, equipamento_id: int = Form(...), ti
         equipamento.tecnico = tecnico
         equipamento.data_atualizacao = datetime.now(brasil_tz)
         db.commit()
+        eventos.publicar_status(db, [equipamento_id])
 
     return RedirectResponse(url=f"/atualizar_status?tipo={tipo_atual}", status_code=303)
 
 
+# ==========================================================
+# 📦 ATUALIZAÇÃO DE STATUS EM LOTE (UMA ÚNICA TRANSAÇÃO)
+# ==========================================================
+class AlteracaoStatus(BaseModel):
+    equipamento_id: int
+    status_anterior: Optional[str]      # status que a tela exibia ao carregar
+    status_novo: str
+    observacao: Optional[str] = None
+    tecnico: Optional[str] = None
+
+
+class LoteStatus(BaseModel):
+    alteracoes: List[AlteracaoStatus]
+
+
+def _conflitos_status(db, alteracoes):
+    """Compara o status_anterior enviado com o status atual gravado no banco."""
+    ids = [a.equipamento_id for a in alteracoes]
+    atuais = dict(
+        db.query(models.StatusEquipamento.id, models.StatusEquipamento.status)
+        .filter(models.StatusEquipamento.id.in_(ids))
+        .all()
+    )
+
+    conflitos = []
+    for a in alteracoes:
+        if a.equipamento_id not in atuais:
+            conflitos.append({"equipamento_id": a.equipamento_id, "motivo": "não encontrado"})
+        elif atuais[a.equipamento_id] != a.status_anterior:
+            conflitos.append({
+                "equipamento_id": a.equipamento_id,
+                "motivo": "status alterado por outro usuário",
+                "status_esperado": a.status_anterior,
+                "status_atual": atuais[a.equipamento_id],
+            })
+    return conflitos
+
+
+@app.post("/atualizar_status_lote")
+def atualizar_status_lote(lote: LoteStatus, db: Session = Depends(get_db)):
+    alteracoes = lote.alteracoes
+    if not alteracoes:
+        return {"ok": True, "atualizados": [], "conflitos": []}
+
+    ids = [a.equipamento_id for a in alteracoes]
+    if len(ids) != len(set(ids)):
+        return JSONResponse({"ok": False, "erro": "Equipamento repetido no lote."}, status_code=400)
+
+    # 🔹 Checagem rápida: rejeita o lote inteiro se algum status já mudou
+    conflitos = _conflitos_status(db, alteracoes)
+    if conflitos:
+        return JSONResponse({"ok": False, "atualizados": [], "conflitos": conflitos}, status_code=409)
+
+    # 🔹 UPDATE condicional (WHERE status = status_anterior) protege contra
+    #    alterações concorrentes entre a checagem acima e a gravação
+    agora = datetime.now(brasil_tz)
+    tabela = models.StatusEquipamento
+    for a in alteracoes:
+        resultado = db.execute(
+            update(tabela)
+            .where(tabela.id == a.equipamento_id, tabela.status == a.status_anterior)
+            .values(
+                status=a.status_novo,
+                observacao=a.observacao,
+                tecnico=a.tecnico,
+                data_atualizacao=agora,
+            )
+        )
+        if resultado.rowcount != 1:
+            db.rollback()
+            conflitos = _conflitos_status(db, alteracoes)
+            return JSONResponse({"ok": False, "atualizados": [], "conflitos": conflitos}, status_code=409)
+
+    # UPDATE direto não passa pelo flush: registra para a sincronização
+    sincronizacao.registrar(db, "status_equipamentos", ids)
+
+    db.add_all([
+        models.HistoricoStatus(
+            equipamento_id=a.equipamento_id,
+            status_anterior=a.status_anterior,
+            status_novo=a.status_novo,
+            observacao=a.observacao,
+            tecnico=a.tecnico,
+            data_modificacao=agora,
+        )
+        for a in alteracoes
+    ])
+    db.commit()
+    eventos.publicar_status(db, ids)
+
+    return {
+        "ok": True,
+        "atualizados": [
+            {
+                "equipamento_id": a.equipamento_id,
+                "status": a.status_novo,
+                "observacao": a.observacao,
+                "tecnico": a.tecnico,
+                "data_atualizacao": agora.strftime("%d/%m/%Y %H:%M"),
+            }
+            for a in alteracoes
+        ],
+        "conflitos": [],
+    }
+
+
+# ==========================================================
+# 🔄 RECEBIMENTO DE LOTES DAS ESTAÇÕES (SERVIDOR CENTRAL)
+# ==========================================================
+# Só responde com CHECKLIST_SYNC_TOKEN definido e enviado em X-Sync-Token
+@app.post("/sincronizacao/lote")
+def receber_lote_sincronizacao(
+    request: Request,
+    dados: bytes = Body(..., media_type="application/octet-stream"),
+    db: Session = Depends(get_db)
+):
+    if not sincronizacao.token_valido(request.headers.get("x-sync-token")):
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+
+    try:
+        resultado = sincronizacao.aplicar_lote(db, dados)
+    except (ValueError, KeyError, zlib.error) as erro:
+        return JSONResponse({"ok": False, "erro": f"Lote inválido: {erro}"}, status_code=400)
+
+    eventos.publicar_status(db, resultado.pop("equipamentos"))
+    return resultado
+
+
 # ==========================================================
 # 🔍 DETALHES POR STATUS E TIPO DE EQUIPAMENTO
 # ==========================================================
 @app.get("/detalhes_status/{status}", response_class=HTMLResponse)
-def detalhes_status(request: Request, status: str, db: Session = Depends(get_db)):
+def detalhes_status(request: Request, status: str, db: Session = Depends(get_db_leitura)):
     status = status.upper()
 
     titulo = {
@@ -752,7 +935,7 @@ def detalhes_status(request: Request, status: str, db: Session = Depends(get_db)
     })
 
 @app.get("/detalhes/{tipo}", response_class=HTMLResponse)
-def detalhes_tipo(request: Request, tipo: str, db: Session = Depends(get_db)):
+def detalhes_tipo(request: Request, tipo: str, db: Session = Depends(get_db_leitura)):
     tipo = unquote(tipo)
 
     # === Busca equipamentos desse tipo ===
@@ -804,7 +987,7 @@ from io import BytesIO
 from datetime import datetime
 
 @app.get("/gerar_pdf_moderno")
-def gerar_pdf_moderno(request: Request, checklist_id: int, db: Session = Depends(get_db)):
+def gerar_pdf_moderno(request: Request, checklist_id: int, db: Session = Depends(get_db_leitura)):
     checklist = db.query(models.Checklist).filter(models.Checklist.id == checklist_id).first()
     if not checklist:
         return {"detail": "Checklist não encontrado"}
@@ -823,31 +1006,36 @@ def gerar_pdf_moderno(request: Request, checklist_id: int, db: Session = Depends
     if checklist.tipo_turno and checklist.tipo_turno.lower().strip() == "supplier":
         tipo_checklist = "supplier"
 
+    # Itens e equipamentos (tabela quente ou arquivo), agrupados por sistema
+    registros, equipamentos_operando = arquivo.carregar_checklist(db, checklist_id)
+    por_sistema = {}
+    for registro in registros:
+        por_sistema.setdefault(registro.sistema, []).append(registro)
+
     # Grupos
     grupos = {
-        "Ar Comprimido": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Ar Comprimido").all(),
-        "Água de Resfriamento": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Água de Resfriamento").all(),
-        "Água Gelada": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Água Gelada").all(),
-        "Climatização Funilaria": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Climatizacao_f").all(),
-        "Climatização Montagem": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Climatizacao_m").all(),
-        "Climatização Communication": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="Climatizacao_c").all(),
-        "DENSO": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="denso").all(),
-        "MMH": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="mmh").all(),
-        "PMC": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="pmc").all(),
-        "Tiberina": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="tiberina").all(),
-        "Revestcoat": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="revest").all(),
-        "Adler": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="adler").all(),
-        "PSMM": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="psmm").all(),
-        "FMM": db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id, sistema="fmm").all(),
+        "Ar Comprimido": por_sistema.get("Ar Comprimido", []),
+        "Água de Resfriamento": por_sistema.get("Água de Resfriamento", []),
+        "Água Gelada": por_sistema.get("Água Gelada", []),
+        "Climatização Funilaria": por_sistema.get("Climatizacao_f", []),
+        "Climatização Montagem": por_sistema.get("Climatizacao_m", []),
+        "Climatização Communication": por_sistema.get("Climatizacao_c", []),
+        "DENSO": por_sistema.get("denso", []),
+        "MMH": por_sistema.get("mmh", []),
+        "PMC": por_sistema.get("pmc", []),
+        "Tiberina": por_sistema.get("tiberina", []),
+        "Revestcoat": por_sistema.get("revest", []),
+        "Adler": por_sistema.get("adler", []),
+        "PSMM": por_sistema.get("psmm", []),
+        "FMM": por_sistema.get("fmm", []),
     }
 
-    equipamentos_operando = db.query(models.StatusOperacaoChecklist).filter_by(checklist_id=checklist_id).all()
-
     # Renderização
     html_content = templates.get_template("pdf_moderno.html").render(
         checklist=checklist,
         grupos=grupos,
         equipamentos_operando=equipamentos_operando,
+        frota=frota.FROTA,
         logo_path=logo_path,
         icon_path=icon_path,
         ok_path=ok_path,
@@ -859,7 +1047,8 @@ def gerar_pdf_moderno(request: Request, checklist_id: int, db: Session = Depends
 
     # PDF
     pdf_buffer = BytesIO()
-    HTML(string=html_content, base_url=f"file:///{base_path.replace(os.sep, '/')}").write_pdf(pdf_buffer)
+    with perfil.fase("pdf"):
+        HTML(string=html_content, base_url=f"file:///{base_path.replace(os.sep, '/')}").write_pdf(pdf_buffer)
 
     # Nome dinâmico do PDF baseado no técnico e na data do checklist
     # === Nome dinâmico do arquivo ===
@@ -887,3 +1076,52 @@ def gerar_pdf_moderno(request: Request, checklist_id: int, db: Session = Depends
     
 
     
+
+
+# ==========================================================
+# 🩺 PERFIS DE REQUISIÇÕES (ADMINISTRADOR)
+# ==========================================================
+# Acesso com ?token=<CHECKLIST_ADMIN_TOKEN> ou cabeçalho X-Admin-Token
+def _admin(request: Request):
+    return perfil.token_valido(request.query_params.get("token") or request.headers.get("x-admin-token"))
+
+
+@app.get("/admin/perfis")
+def admin_perfis(request: Request):
+    if not _admin(request):
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return {"pasta": perfil.PASTA, "perfis": perfil.listar()}
+
+
+@app.get("/admin/perfis/{nome}")
+def admin_perfil(request: Request, nome: str, formato: str = Query("txt", pattern="^(txt|prof)$")):
+    if not _admin(request):
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+
+    caminho = perfil.caminho(nome, "." + formato)
+    if not caminho:
+        return JSONResponse({"detail": "Perfil não encontrado"}, status_code=404)
+    if formato == "prof":
+        # Para abrir no snakeviz / pstats
+        return FileResponse(caminho, media_type="application/octet-stream", filename=f"{nome}.prof")
+    with open(caminho, encoding="utf-8") as relatorio:
+        return PlainTextResponse(relatorio.read())
+
+
+# ==========================================================
+# 💚 SAÚDE E PRONTIDÃO (SERVIÇO / BALANCEADOR)
+# ==========================================================
+@app.get("/saude")
+def saude():
+    # Processo vivo e atendendo; não toca no banco
+    return {"status": "ok", "pid": os.getpid(), "worker": os.getenv("CHECKLIST_WORKER")}
+
+
+@app.get("/pronto")
+def pronto():
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse({"status": "indisponivel", "erro": str(e)}, status_code=503)
+    return {"status": "pronto", "pid": os.getpid(), "replica": replica.usar_replica()}
@@ -0,0 +1,58 @@
+import argparse
+
+from sqlalchemy import inspect, text
+
+import models
+from database import engine
+
+# ==========================================================
+# 🗂️ MIGRAÇÃO: ÍNDICES NOVOS EM TABELAS JÁ EXISTENTES
+# ==========================================================
+# create_all só cria tabelas que faltam: um índice declarado depois (index=True
+# em models.py) não chega aos bancos antigos. Esta migração cria os índices do
+# models.py que não existem no banco, como checklist.data_criacao e os
+# checklist_id de itens_registro e status_operacao_checklist (o SQLite não
+# indexa chave estrangeira sozinho).
+#
+# Um índice já coberto por outro que começa pelas mesmas colunas (no MySQL, o
+# índice criado junto com a chave estrangeira) é pulado.
+#
+# Uso (com o servidor parado):  python migracao_indices.py
+
+
+def indices_faltando(conn):
+    """[(tabela, índice)] declarados no models.py e ausentes no banco."""
+    inspetor = inspect(conn)
+    existentes = set(inspetor.get_table_names())
+    faltando = []
+    for tabela in models.Base.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            continue                      # create_all cria a tabela já com os índices
+        no_banco = inspetor.get_indexes(tabela.name)
+        for indice in sorted(tabela.indexes, key=lambda i: i.name):
+            if indice.dialect_kwargs:
+                continue                  # FULLTEXT e afins ficam com create_all
+            colunas = [coluna.name for coluna in indice.columns]
+            if any(i["name"] == indice.name or i["column_names"][:len(colunas)] == colunas for i in no_banco):
+                continue
+            faltando.append((tabela, indice))
+    return faltando
+
+
+def criar_indices():
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        faltando = indices_faltando(conn)
+        for tabela, indice in faltando:
+            colunas = ", ".join(coluna.name for coluna in indice.columns)
+            unico = "UNIQUE " if indice.unique else ""
+            print(f"🗂️ {tabela.name} ({colunas})")
+            conn.execute(text(f"CREATE {unico}INDEX {indice.name} ON {tabela.name} ({colunas})"))
+    return len(faltando)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cria nos bancos antigos os índices novos do models.py.")
+    parser.parse_args()
+    total = criar_indices()
+    print(f"✅ {total} índice(s) criado(s)." if total else "✅ Todos os índices já existem; nada a migrar.")
@@ -0,0 +1,174 @@
+import argparse
+
+from sqlalchemy import MetaData, Table, func, inspect, insert, select, text, update
+
+import arquivo
+import models
+from database import SessionLocal, engine
+
+# ==========================================================
+# 🧬 MIGRAÇÃO: ITENS_REGISTRO → VERSÕES DE ITENS (ITENS_MODELO)
+# ==========================================================
+# Bancos criados antes de itens_modelo guardam sistema, descrição, unidade e
+# limites repetidos em cada leitura. Esta migração:
+#   1. cria itens_modelo e a coluna itens_registro.modelo_id;
+#   2. cria uma versão para cada item atual do catálogo e para cada
+#      combinação antiga encontrada nas leituras;
+#   3. aponta cada leitura para a sua versão;
+#   4. remove as colunas copiadas e compacta a tabela.
+#
+# Uso (com o servidor parado):  python migracao_modelos.py
+
+COLUNAS_ANTIGAS = ["sistema", "descricao", "unidade", "valor_min", "valor_max"]
+
+
+def _colunas_registro():
+    return {coluna["name"] for coluna in inspect(engine).get_columns("itens_registro")}
+
+
+def verificar_esquema():
+    """Impede a aplicação de subir num banco que ainda não passou por esta migração.
+
+    create_all não acrescenta itens_registro.modelo_id a uma tabela existente, e
+    sem a coluna toda gravação e leitura de checklist falharia.
+    """
+    if "modelo_id" not in _colunas_registro():
+        raise SystemExit(
+            "❌ itens_registro sem a coluna modelo_id: este banco ainda não foi migrado.\n"
+            "   Com o servidor parado, rode os passos de 'Atualização de um banco existente' do README\n"
+            "   (começando por: python migracao_modelos.py)."
+        )
+
+
+def _tamanho(tabela):
+    db = SessionLocal()
+    try:
+        return arquivo.tamanho_tabela(db, tabela)
+    finally:
+        db.close()
+
+
+def criar_versoes(conn, legado):
+    modelo = models.ItemModelo.__table__
+    catalogo = models.ItemChecklist.__table__
+
+    existentes = {
+        (linha.item_id, *[getattr(linha, c) for c in COLUNAS_ANTIGAS])
+        for linha in conn.execute(select(modelo))
+    }
+    versoes = dict(
+        conn.execute(select(modelo.c.item_id, func.max(modelo.c.versao)).group_by(modelo.c.item_id)).all()
+    )
+
+    def nova_versao(item_id, campos):
+        chave = (item_id, *[campos[c] for c in COLUNAS_ANTIGAS])
+        if chave in existentes:
+            return 0
+        versoes[item_id] = versoes.get(item_id, 0) + 1
+        conn.execute(insert(modelo).values(item_id=item_id, versao=versoes[item_id], **campos))
+        existentes.add(chave)
+        return 1
+
+    criadas = 0
+    ids_catalogo = {}
+    for item in conn.execute(select(catalogo)):
+        ids_catalogo.setdefault((item.sistema, item.descricao), item.id)
+        criadas += nova_versao(item.id, {c: getattr(item, c) for c in COLUNAS_ANTIGAS})
+
+    # Combinações antigas que não existem mais no catálogo atual
+    combinacoes = conn.execute(
+        select(*[legado.c[c] for c in COLUNAS_ANTIGAS]).where(legado.c.modelo_id.is_(None)).distinct()
+    ).all()
+    for combinacao in combinacoes:
+        campos = dict(zip(COLUNAS_ANTIGAS, combinacao))
+        item_id = ids_catalogo.get((campos["sistema"], campos["descricao"]))
+        criadas += nova_versao(item_id, campos)
+
+    return criadas
+
+
+def apontar_registros(legado, lote):
+    modelo = models.ItemModelo.__table__
+    versao = (
+        select(func.min(modelo.c.id))
+        .where(*[modelo.c[c].is_not_distinct_from(legado.c[c]) for c in COLUNAS_ANTIGAS])
+        .scalar_subquery()
+    )
+
+    with engine.connect() as conn:
+        maior_id = conn.execute(select(func.max(legado.c.id))).scalar() or 0
+
+    inicio = 0
+    while inicio <= maior_id:
+        with engine.begin() as conn:
+            conn.execute(
+                update(legado)
+                .where(legado.c.id > inicio, legado.c.id <= inicio + lote, legado.c.modelo_id.is_(None))
+                .values(modelo_id=versao)
+            )
+        inicio += lote
+        print(f"   ... {min(inicio, maior_id)}/{maior_id} leituras")
+
+
+def remover_colunas(dialeto):
+    with engine.begin() as conn:
+        if dialeto == "mysql":
+            conn.execute(text(
+                "ALTER TABLE itens_registro "
+                + ", ".join(f"DROP COLUMN {c}" for c in COLUNAS_ANTIGAS)
+                + ", ADD CONSTRAINT fk_itens_registro_modelo FOREIGN KEY (modelo_id) REFERENCES itens_modelo (id)"
+            ))
+        else:
+            for coluna in COLUNAS_ANTIGAS:
+                conn.execute(text(f"ALTER TABLE itens_registro DROP COLUMN {coluna}"))
+
+    # Devolve ao disco o espaço liberado
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("OPTIMIZE TABLE itens_registro" if dialeto == "mysql" else "VACUUM"))
+
+
+def migrar(lote=20000, manter_colunas=False):
+    models.Base.metadata.create_all(bind=engine)
+    colunas = _colunas_registro()
+    if not set(COLUNAS_ANTIGAS) & colunas:
+        print("✅ itens_registro já está no formato novo; nada a migrar.")
+        return
+
+    dialeto = engine.dialect.name
+    antes = _tamanho("itens_registro")
+
+    if "modelo_id" not in colunas:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE itens_registro ADD COLUMN modelo_id INTEGER"))
+            conn.execute(text("CREATE INDEX ix_itens_registro_modelo_id ON itens_registro (modelo_id)"))
+
+    legado = Table("itens_registro", MetaData(), autoload_with=engine)
+
+    with engine.begin() as conn:
+        criadas = criar_versoes(conn, legado)
+    print(f"🧬 {criadas} versões de itens criadas.")
+
+    apontar_registros(legado, lote)
+
+    with engine.connect() as conn:
+        sem_modelo = conn.execute(
+            select(func.count()).select_from(legado).where(legado.c.modelo_id.is_(None))
+        ).scalar()
+    if sem_modelo:
+        raise RuntimeError(f"{sem_modelo} leituras ficaram sem versão; colunas antigas mantidas.")
+
+    if manter_colunas:
+        print("⚠️ Colunas antigas mantidas (--manter-colunas).")
+        return
+
+    remover_colunas(dialeto)
+    depois = _tamanho("itens_registro")
+    print(f"✅ Migração concluída. itens_registro: {antes} → {depois} bytes.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra itens_registro para versões de itens (itens_modelo).")
+    parser.add_argument("--lote", type=int, default=20000, help="leituras atualizadas por transação")
+    parser.add_argument("--manter-colunas", action="store_true", help="não remove as colunas antigas")
+    args = parser.parse_args()
+    migrar(lote=args.lote, manter_colunas=args.manter_colunas)
@@ -0,0 +1,88 @@
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# ==========================================================
+# 🧬 RESOLUÇÃO DA VERSÃO VIGENTE DE CADA ITEM DO CATÁLOGO
+# ==========================================================
+# As leituras (ItemRegistro) guardam apenas o id da versão do item. A
+# assinatura abaixo identifica uma versão; enquanto o catálogo não muda,
+# a resolução é feita só pelo cache em memória, sem consultar o banco.
+
+CAMPOS = ("sistema", "descricao", "unidade", "valor_min", "valor_max")
+
+_cache = {}                 # (item_id, *CAMPOS) → modelo_id
+_lock = threading.Lock()
+
+
+def assinatura(item_id, origem):
+    return (item_id,) + tuple(getattr(origem, campo) for campo in CAMPOS)
+
+
+def modelos_vigentes(db, itens):
+    """{item.id: modelo_id} para os itens do catálogo, criando versões novas quando necessário.
+
+    Deve ser chamado antes de qualquer escrita da sessão: versões novas são
+    gravadas numa transação própria, para que o cache só guarde ids já
+    confirmados no banco.
+    """
+    faltando = [item for item in itens if assinatura(item.id, item) not in _cache]
+    if faltando:
+        _resolver(db.get_bind(), faltando)
+    return {item.id: _cache[assinatura(item.id, item)] for item in itens}
+
+
+def _resolver(bind, itens):
+    with _lock, Session(bind=bind) as sessao:
+        existentes = (
+            sessao.query(models.ItemModelo)
+            .filter(models.ItemModelo.item_id.in_([item.id for item in itens]))
+            .all()
+        )
+        for modelo in existentes:
+            _cache[assinatura(modelo.item_id, modelo)] = modelo.id
+
+        for item in itens:
+            chave = assinatura(item.id, item)
+            if chave not in _cache:
+                _cache[chave] = _criar_versao(sessao, item)
+
+
+def _criar_versao(sessao, item):
+    modelo_id = criar_versao(sessao, item.id, {campo: getattr(item, campo) for campo in CAMPOS})
+    sessao.commit()
+    return modelo_id
+
+
+def criar_versao(sessao, item_id, campos):
+    """Grava uma versão nova do item dentro da transação aberta da sessão (savepoint).
+
+    Se outra transação criar a mesma versão ao mesmo tempo, reaproveita a dela
+    quando for igual; senão tenta de novo com o número seguinte.
+    """
+    for _ in range(3):
+        ultima = (
+            sessao.query(func.max(models.ItemModelo.versao))
+            .filter(models.ItemModelo.item_id == item_id)
+            .scalar()
+        ) or 0
+        modelo = models.ItemModelo(item_id=item_id, versao=ultima + 1, **campos)
+        try:
+            with sessao.begin_nested():
+                sessao.add(modelo)
+            return modelo.id
+        except IntegrityError:
+            # Leitura com trava: enxerga a versão que a outra transação acabou de confirmar
+            igual = sessao.query(models.ItemModelo).filter_by(item_id=item_id, **campos).with_for_update().first()
+            if igual:
+                return igual.id
+    raise RuntimeError(f"Não foi possível criar versão para o item {item_id}")
+
+
+def limpar_cache():
+    with _lock:
+        _cache.clear()
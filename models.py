@@ -1,11 +1,15 @@
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, LargeBinary, Index, Text, UniqueConstraint, DDL, event
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from database import Base
 
 # 🕒 Definir o fuso horário de Brasília (UTC -3)
 brasil_tz = timezone(timedelta(hours=-3))
 
+# 🏢 Sistemas gravados pelo checklist do Supplier Park (nomes reais do banco)
+SISTEMAS_SUPPLIER = ["denso", "mmh", "pmc", "tiberina", "revest", "adler", "psmm", "fmm"]
+
 # =========================================================
 # 📋 TABELA CHECKLIST PRINCIPAL
 # =========================================================
@@ -20,10 +24,12 @@ class Checklist(Base):
     especialidade_team_leader = Column(String(80))
     turno = Column(String(40))
     tipo_turno = Column(String(40))
-    data_criacao = Column(DateTime, default=lambda: datetime.now(brasil_tz))
+    data_criacao = Column(DateTime, default=lambda: datetime.now(brasil_tz), index=True)
 
     registros = relationship("ItemRegistro", back_populates="checklist")
     status_operacoes = relationship("StatusOperacaoChecklist", back_populates="checklist")
+    operacao = relationship("OperacaoChecklist", back_populates="checklist", uselist=False)
+    arquivo = relationship("ChecklistArquivo", back_populates="checklist", uselist=False)
 
 # =========================================================
 # 🧾 ITENS FIXOS DO CHECKLIST (MODELO BASE)
@@ -39,23 +45,48 @@ class ItemChecklist(Base):
     valor_max = Column(Float)
 
 # =========================================================
-# 🧾 ITENS REGISTRADOS EM CADA CHECKLIST
+# 🧬 VERSÕES IMUTÁVEIS DOS ITENS DO CATÁLOGO
 # =========================================================
-class ItemRegistro(Base):
-    __tablename__ = "itens_registro"
+# Uma linha por versão de cada ItemChecklist. Sempre que sistema, descrição,
+# unidade ou limites mudam no catálogo, uma nova versão é criada e as leituras
+# seguintes passam a apontar para ela; as antigas continuam na versão original.
+class ItemModelo(Base):
+    __tablename__ = "itens_modelo"
+    __table_args__ = (UniqueConstraint("item_id", "versao", name="uq_itens_modelo_item_versao"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    checklist_id = Column(Integer, ForeignKey("checklist.id"))
-    sistema = Column(String(80))
+    item_id = Column(Integer, ForeignKey("itens_checklist.id"), nullable=True, index=True)
+    versao = Column(Integer, default=1)
+    sistema = Column(String(80), index=True)
     descricao = Column(String(120))
     unidade = Column(String(10))
     valor_min = Column(Float)
     valor_max = Column(Float)
+    criado_em = Column(DateTime, default=lambda: datetime.now(brasil_tz))
+
+# =========================================================
+# 🧾 ITENS REGISTRADOS EM CADA CHECKLIST
+# =========================================================
+class ItemRegistro(Base):
+    __tablename__ = "itens_registro"
+
+    id = Column(Integer, primary_key=True, index=True)
+    checklist_id = Column(Integer, ForeignKey("checklist.id"), index=True)
+    modelo_id = Column(Integer, ForeignKey("itens_modelo.id"), index=True)
     valor_registrado = Column(Float, nullable=True)
     status_ok = Column(Boolean, nullable=True)
     comentario = Column(String(255), nullable=True)
 
     checklist = relationship("Checklist", back_populates="registros")
+    modelo = relationship("ItemModelo", lazy="joined")
+
+    # Campos do modelo lidos como antes (templates, PDF, arquivo)
+    sistema = association_proxy("modelo", "sistema")
+    descricao = association_proxy("modelo", "descricao")
+    unidade = association_proxy("modelo", "unidade")
+    valor_min = association_proxy("modelo", "valor_min")
+    valor_max = association_proxy("modelo", "valor_max")
+    item_id = association_proxy("modelo", "item_id")
 
 # =========================================================
 # ⚙️ STATUS GERAL DOS EQUIPAMENTOS
@@ -97,7 +128,7 @@ class StatusOperacaoChecklist(Base):
     __table_args__ = {'extend_existing': True}
 
     id = Column(Integer, primary_key=True, index=True)
-    checklist_id = Column(Integer, ForeignKey("checklist.id"))
+    checklist_id = Column(Integer, ForeignKey("checklist.id"), index=True)
     nome_equipamento = Column(String(100))
     tipo = Column(String(50))
     status = Column(String(20))  # Operando, Parado, Manutenção
@@ -106,3 +137,156 @@ class StatusOperacaoChecklist(Base):
     data_registro = Column(DateTime, default=datetime.now)
 
     checklist = relationship("Checklist", back_populates="status_operacoes")
+
+# =========================================================
+# 🔢 EQUIPAMENTOS OPERANDO NO CHECKLIST (MAPA DE BITS)
+# =========================================================
+# Uma linha por checklist no lugar de uma linha por equipamento marcado.
+# O mapa tem um inteiro (hexadecimal) por tipo da frota, ex.: "torre:a3f,bac:1f";
+# a codificação fica em frota.py. Checklists antigos continuam em
+# status_operacao_checklist.
+class OperacaoChecklist(Base):
+    __tablename__ = "operacao_checklist"
+
+    checklist_id = Column(Integer, ForeignKey("checklist.id"), primary_key=True)
+    mapa = Column(String(255), default="")
+
+    checklist = relationship("Checklist", back_populates="operacao")
+
+# =========================================================
+# 🗄️ CHECKLISTS ANTIGOS ARQUIVADOS (LEITURAS COMPACTADAS)
+# =========================================================
+class ChecklistArquivo(Base):
+    __tablename__ = "checklist_arquivo"
+
+    checklist_id = Column(Integer, ForeignKey("checklist.id"), primary_key=True)
+    local = Column(String(10))                  # "main" ou "supplier"
+    total_registros = Column(Integer)
+    total_operacoes = Column(Integer)
+    tamanho_bruto = Column(Integer)             # bytes do JSON antes da compressão
+    dados = Column(LargeBinary(length=2**24))   # JSON colunar comprimido (zlib)
+    arquivado_em = Column(DateTime, default=lambda: datetime.now(brasil_tz))
+
+    checklist = relationship("Checklist", back_populates="arquivo")
+
+
+# Itens do catálogo presentes em cada arquivo: a série de um item (series.py)
+# só descomprime os arquivos que têm leitura dele
+class ChecklistArquivoItem(Base):
+    __tablename__ = "checklist_arquivo_itens"
+    __table_args__ = (Index("ix_checklist_arquivo_itens_item", "item_id", "checklist_id"),)
+
+    checklist_id = Column(Integer, ForeignKey("checklist_arquivo.checklist_id"), primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+
+# =========================================================
+# 🔎 ÍNDICE DE BUSCA TEXTUAL (COMENTÁRIOS E OBSERVAÇÕES)
+# =========================================================
+class IndiceBusca(Base):
+    __tablename__ = "indice_busca"
+    __table_args__ = (
+        Index("ix_indice_busca_origem", "origem", "origem_id", unique=True),
+        Index("ix_indice_busca_texto", "texto_busca", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    origem = Column(String(10))           # "item" (ItemRegistro) ou "status" (HistoricoStatus)
+    origem_id = Column(Integer)
+    checklist_id = Column(Integer, nullable=True, index=True)
+    equipamento_id = Column(Integer, nullable=True, index=True)
+    sistema = Column(String(80), index=True)    # sistema do item ou tipo do equipamento
+    titulo = Column(String(120))                # descrição do item ou nome do equipamento
+    data = Column(DateTime, index=True)
+    texto = Column(String(255))                 # texto original, para exibição
+    texto_busca = Column(String(255))           # texto normalizado (minúsculo, sem acentos)
+
+
+# 🔹 No SQLite o índice textual é uma tabela FTS5 de conteúdo externo,
+#    mantida por triggers a partir de indice_busca
+for _ddl in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS indice_busca_fts USING fts5("
+    "texto_busca, content='indice_busca', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS indice_busca_ai AFTER INSERT ON indice_busca BEGIN "
+    "INSERT INTO indice_busca_fts(rowid, texto_busca) VALUES (new.id, new.texto_busca); END",
+    "CREATE TRIGGER IF NOT EXISTS indice_busca_ad AFTER DELETE ON indice_busca BEGIN "
+    "INSERT INTO indice_busca_fts(indice_busca_fts, rowid, texto_busca) VALUES ('delete', old.id, old.texto_busca); END",
+):
+    event.listen(IndiceBusca.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+
+# =========================================================
+# 🔄 SINCRONIZAÇÃO ESTAÇÃO → SERVIDOR CENTRAL
+# =========================================================
+# Na estação: uma linha por alteração nas tabelas sincronizadas (ver sincronizacao.py)
+class LogAlteracao(Base):
+    __tablename__ = "log_alteracoes"
+    # ids nunca reaproveitados depois da poda: o checkpoint compara por id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    tabela = Column(String(40))
+    registro_id = Column(Integer)
+    operacao = Column(String(10))               # insert, update ou delete
+    criado_em = Column(DateTime, default=datetime.now)
+
+
+# Na central: id de cada registro recebido de uma estação → id gravado aqui
+class MapaSincronizacao(Base):
+    __tablename__ = "sincronizacao_mapa"
+    __table_args__ = (UniqueConstraint("estacao", "tabela", "id_local", name="uq_sincronizacao_mapa"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    estacao = Column(String(80))
+    tabela = Column(String(40))
+    id_local = Column(Integer)
+    id_central = Column(Integer)
+
+
+# Último log confirmado: "envio:<destino>" na estação, "recebido:<estação>" na central
+class CheckpointSincronizacao(Base):
+    __tablename__ = "sincronizacao_checkpoint"
+
+    chave = Column(String(120), primary_key=True)
+    ultimo_log_id = Column(Integer, default=0)
+    atualizado_em = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+# =========================================================
+# 🪞 PULSO DA RÉPLICA DE LEITURA
+# =========================================================
+# Gravado no banco principal a cada poucos segundos (ver replica.py). Lido na
+# réplica, diz até quando ela está em dia com o principal.
+class PulsoReplica(Base):
+    __tablename__ = "replica_pulso"
+
+    id = Column(Integer, primary_key=True)
+    batido_em = Column(Float)                   # time.time() do servidor que gravou
+
+
+# =========================================================
+# 🔑 CHAVES DE ENVIO JÁ PROCESSADAS (IDEMPOTÊNCIA)
+# =========================================================
+# Uma linha por envio do formulário; reenvios com a mesma chave devolvem o
+# checklist original (ver idempotencia.py)
+class ChaveIdempotencia(Base):
+    __tablename__ = "chaves_idempotencia"
+
+    chave = Column(String(64), primary_key=True)
+    checklist_id = Column(Integer, index=True)
+    criado_em = Column(DateTime, default=datetime.now)
+    expira_em = Column(DateTime, index=True)
+
+
+# =========================================================
+# 📡 EVENTOS DOS DASHBOARDS ENTRE WORKERS
+# =========================================================
+# Com vários workers (servidor.py), cada evento publicado vira uma linha aqui
+# e cada worker repassa as novas aos seus assinantes (ver eventos.py)
+class EventoPainel(Base):
+    __tablename__ = "eventos_painel"
+    # ids nunca reaproveitados: cada worker lê a partir do último id visto
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    evento = Column(String(20))
+    dados = Column(Text)                        # JSON já serializado
+    criado_em = Column(DateTime, default=datetime.now, index=True)
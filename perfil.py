@@ -0,0 +1,252 @@
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import jinja2
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ==========================================================
+# 🩺 PERFIL DE REQUISIÇÕES SOB DEMANDA (SÓ ADMINISTRADOR)
+# ==========================================================
+# Desligado enquanto CHECKLIST_ADMIN_TOKEN não estiver definido. Com o token,
+# uma requisição com ?perfil=<token> (ou cabeçalho X-Perfil: <token>) roda o
+# endpoint sob o cProfile e mede o tempo gasto em SQL, na renderização dos
+# templates Jinja e na montagem do PDF. O relatório vai para uma pasta com
+# rotação (os mais antigos são apagados) e é lido em /admin/perfis.
+
+TOKEN = os.getenv("CHECKLIST_ADMIN_TOKEN", "")
+MAX_PERFIS = int(os.getenv("CHECKLIST_PERFIS_MAX", "50"))
+
+if getattr(sys, "frozen", False):
+    _pasta_base = os.path.dirname(sys.executable)
+else:
+    _pasta_base = os.path.dirname(os.path.abspath(__file__))
+PASTA = os.getenv("CHECKLIST_PERFIS_DIR", os.path.join(_pasta_base, "perfis"))
+
+FASES = ("sql", "template", "pdf")
+_NOME_VALIDO = re.compile(r"^[\w.-]+$")
+
+_coleta = contextvars.ContextVar("perfil_coleta", default=None)
+
+
+class Coleta:
+    def __init__(self, metodo, caminho):
+        self.metodo = metodo
+        self.caminho = caminho
+        self.nome = datetime.now().strftime("%Y%m%d-%H%M%S-%f") + "_" + re.sub(r"\W+", "_", caminho).strip("_")
+        self.fases = {fase: 0.0 for fase in FASES}
+        self.consultas = 0
+        self.estatisticas = None
+        self.status = None
+
+
+def token_valido(valor):
+    return bool(TOKEN) and bool(valor) and hmac.compare_digest(valor, TOKEN)
+
+
+@contextmanager
+def fase(nome):
+    """Soma o tempo do bloco na fase indicada, quando a requisição está sendo perfilada."""
+    coleta = _coleta.get()
+    if coleta is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        coleta.fases[nome] += time.perf_counter() - inicio
+
+
+# ==========================================================
+# 🔌 MIDDLEWARE ASGI: LIGA A COLETA NA REQUISIÇÃO
+# ==========================================================
+class PerfilMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not TOKEN or scope["type"] != "http" or not self._pedido(scope):
+            await self.app(scope, receive, send)
+            return
+
+        coleta = Coleta(scope["method"], scope["path"])
+        marcador = _coleta.set(coleta)
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                coleta.status = mensagem["status"]
+                mensagem.setdefault("headers", [])
+                mensagem["headers"] = list(mensagem["headers"]) + [(b"x-perfil", coleta.nome.encode())]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _coleta.reset(marcador)
+            salvar(coleta, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _pedido(scope):
+        for nome, valor in scope.get("headers", []):
+            if nome == b"x-perfil":
+                return token_valido(valor.decode("latin-1"))
+        consulta = scope.get("query_string", b"")
+        if b"perfil=" not in consulta:
+            return False
+        valores = parse_qs(consulta.decode("latin-1")).get("perfil", [])
+        return token_valido(valores[0] if valores else "")
+
+
+# ==========================================================
+# ⏱️ ROTA PERFILADA: cProfile NA THREAD DO ENDPOINT
+# ==========================================================
+# Endpoints síncronos rodam no threadpool e o cProfile só enxerga a thread
+# em que foi ligado, por isso o endpoint é embrulhado aqui, e não no middleware.
+# Um perfilador por vez: se duas requisições perfiladas chegarem juntas, a
+# segunda fica só com a medição das fases.
+_perfilador_livre = threading.Lock()
+
+
+@contextmanager
+def _perfilador(coleta):
+    if not _perfilador_livre.acquire(blocking=False):
+        yield
+        return
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    try:
+        yield
+    finally:
+        perfilador.disable()
+        coleta.estatisticas = perfilador
+        _perfilador_livre.release()
+
+
+class RotaPerfilada(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        if TOKEN:
+            endpoint = _embrulhar(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _embrulhar(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def assincrono(*args, **kwargs):
+            coleta = _coleta.get()
+            if coleta is None:
+                return await endpoint(*args, **kwargs)
+            with _perfilador(coleta):
+                return await endpoint(*args, **kwargs)
+        return assincrono
+
+    @functools.wraps(endpoint)
+    def sincrono(*args, **kwargs):
+        coleta = _coleta.get()
+        if coleta is None:
+            return endpoint(*args, **kwargs)
+        with _perfilador(coleta):
+            return endpoint(*args, **kwargs)
+    return sincrono
+
+
+# ==========================================================
+# 🧩 FASES: SQL (EVENTOS DO ENGINE) E TEMPLATES (JINJA)
+# ==========================================================
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if _coleta.get() is not None:
+        conn.info.setdefault("perfil_inicio", []).append(time.perf_counter())
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    coleta = _coleta.get()
+    inicios = conn.info.get("perfil_inicio")
+    if coleta is not None and inicios:
+        coleta.fases["sql"] += time.perf_counter() - inicios.pop()
+        coleta.consultas += 1
+
+
+class TemplatePerfilado(jinja2.Template):
+    def render(self, *args, **kwargs):
+        with fase("template"):
+            return super().render(*args, **kwargs)
+
+
+def instalar(templates):
+    """Liga a medição de fases; sem token nada é registrado (custo zero)."""
+    if not TOKEN:
+        return
+    event.listen(Engine, "before_cursor_execute", _antes_sql)
+    event.listen(Engine, "after_cursor_execute", _depois_sql)
+    templates.env.template_class = TemplatePerfilado
+
+
+# ==========================================================
+# 💾 RELATÓRIOS EM DISCO (COM ROTAÇÃO)
+# ==========================================================
+def salvar(coleta, total):
+    os.makedirs(PASTA, exist_ok=True)
+    base = os.path.join(PASTA, coleta.nome)
+
+    medido = sum(coleta.fases.values())
+    linhas = [
+        f"{coleta.metodo} {coleta.caminho}  status {coleta.status}  total {total * 1000:.1f} ms",
+        f"  sql       {coleta.fases['sql'] * 1000:9.1f} ms  ({coleta.consultas} consultas)",
+        f"  template  {coleta.fases['template'] * 1000:9.1f} ms",
+        f"  pdf       {coleta.fases['pdf'] * 1000:9.1f} ms",
+        f"  restante  {max(total - medido, 0) * 1000:9.1f} ms",
+        "",
+    ]
+    if coleta.estatisticas is not None:
+        coleta.estatisticas.dump_stats(base + ".prof")
+        saida = io.StringIO()
+        pstats.Stats(coleta.estatisticas, stream=saida).sort_stats("cumulative").print_stats(40)
+        linhas += ["---- cProfile (tempo acumulado, 40 maiores) ----", saida.getvalue()]
+
+    with open(base + ".txt", "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(linhas))
+    _rotacionar()
+
+
+def _rotacionar():
+    relatorios = sorted(n for n in os.listdir(PASTA) if n.endswith(".txt"))
+    for nome in relatorios[:-MAX_PERFIS] if MAX_PERFIS else []:
+        for extensao in (".txt", ".prof"):
+            caminho = os.path.join(PASTA, nome[:-4] + extensao)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+def listar():
+    if not os.path.isdir(PASTA):
+        return []
+    perfis = []
+    for nome in sorted((n for n in os.listdir(PASTA) if n.endswith(".txt")), reverse=True):
+        with open(os.path.join(PASTA, nome), encoding="utf-8") as arquivo:
+            resumo = arquivo.readline().strip()
+        perfis.append({"nome": nome[:-4], "resumo": resumo})
+    return perfis
+
+
+def caminho(nome, extensao):
+    """Caminho do relatório pedido, ou None se o nome for inválido ou não existir."""
+    if not _NOME_VALIDO.match(nome):
+        return None
+    arquivo = os.path.join(PASTA, nome + extensao)
+    return arquivo if os.path.isfile(arquivo) else None
@@ -0,0 +1,148 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from sqlalchemy import select, update
+
+import models
+from database import REPLICA_URL, SQLALCHEMY_DATABASE_URL, SessionLeitura, SessionLocal
+
+# ==========================================================
+# 🪞 RÉPLICA DE LEITURA: QUEM LÊ DE ONDE
+# ==========================================================
+# Com CHECKLIST_DB_REPLICA_URL definido, as telas só de leitura (histórico,
+# dashboards, análises, PDF) usam a réplica e as gravações ficam no principal.
+#
+# - Pulso: uma thread grava time.time() em replica_pulso no principal a cada
+#   PULSO_INTERVALO segundos. O pulso lido na réplica mostra até quando ela
+#   está em dia; se estiver mais de ATRASO_MAX segundos atrás (ou não puder ser
+#   lido), a leitura volta para o principal.
+# - Ler o que acabou de gravar: depois de um POST o navegador recebe o cookie
+#   COOKIE com a hora da gravação. Enquanto a réplica não tiver um pulso
+#   posterior a essa hora, as leituras dessa pessoa vão para o principal (assim o
+#   redirecionamento salvar → / já mostra o checklist salvo).
+ATIVA = bool(REPLICA_URL)
+ATRASO_MAX = float(os.getenv("CHECKLIST_REPLICA_ATRASO_MAX", "30"))
+PULSO_INTERVALO = 2.0
+COOKIE = "checklist_gravou"
+_VALIDADE_PULSO = 1.0                            # s entre duas leituras do pulso na réplica
+_METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+_ultimo_pulso = {"lido_em": 0.0, "valor": None}
+
+
+def pulso_replica():
+    """Último pulso visto na réplica (com cache curto), ou None se não der para ler."""
+    agora = time.monotonic()
+    if agora - _ultimo_pulso["lido_em"] < _VALIDADE_PULSO:
+        return _ultimo_pulso["valor"]
+    try:
+        with SessionLeitura() as db:
+            valor = db.execute(select(models.PulsoReplica.batido_em).where(models.PulsoReplica.id == 1)).scalar()
+    except Exception:
+        valor = None
+    _ultimo_pulso.update(lido_em=agora, valor=valor)
+    return valor
+
+
+def usar_replica(gravou_em=None):
+    if not ATIVA:
+        return False
+    pulso = pulso_replica()
+    if pulso is None or time.time() - pulso > ATRASO_MAX:
+        return False
+    if gravou_em:
+        try:
+            return pulso >= float(gravou_em)
+        except ValueError:
+            return False
+    return True
+
+
+def sessao_leitura(gravou_em=None):
+    return SessionLeitura() if usar_replica(gravou_em) else SessionLocal()
+
+
+# ==========================================================
+# 💓 PULSO NO BANCO PRINCIPAL
+# ==========================================================
+def bater_pulso():
+    with SessionLocal() as db:
+        alterados = db.execute(
+            update(models.PulsoReplica).where(models.PulsoReplica.id == 1).values(batido_em=time.time())
+        ).rowcount
+        if not alterados:
+            db.add(models.PulsoReplica(id=1, batido_em=time.time()))
+        db.commit()
+
+
+def _laco_pulso():
+    while True:
+        try:
+            bater_pulso()
+        except Exception as e:
+            print(f"⚠️ Pulso da réplica não gravado: {e}")
+        time.sleep(PULSO_INTERVALO)
+
+
+def iniciar_pulso():
+    threading.Thread(target=_laco_pulso, name="pulso-replica", daemon=True).start()
+
+
+# ==========================================================
+# 🍪 MIDDLEWARE ASGI: MARCA QUEM ACABOU DE GRAVAR
+# ==========================================================
+class FixarPrincipalMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ATIVA or scope["type"] != "http" or scope["method"] in _METODOS_LEITURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                # Hora tomada depois do commit do endpoint: pulso >= cookie ⇒ réplica já tem a gravação
+                cookie = f"{COOKIE}={time.time():.3f}; Max-Age={int(ATRASO_MAX)}; Path=/; HttpOnly; SameSite=Lax"
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+
+
+# ==========================================================
+# 📋 CÓPIA SQLITE → SQLITE (RÉPLICA LOCAL PARA TESTE/ESTAÇÃO)
+# ==========================================================
+def _arquivo_sqlite(url):
+    if not url.startswith("sqlite:///"):
+        raise SystemExit(f"❌ Cópia só entre arquivos SQLite: {url or '(não definido)'}")
+    return url[len("sqlite:///"):]
+
+
+def copiar(origem, destino):
+    """Copia o banco inteiro de uma vez (backup online do SQLite, consistente)."""
+    with sqlite3.connect(origem, timeout=30) as fonte, sqlite3.connect(destino, timeout=30) as alvo:
+        fonte.backup(alvo)
+    fonte.close()
+    alvo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copia o banco SQLite principal para a réplica de leitura.")
+    parser.add_argument("--origem", default=SQLALCHEMY_DATABASE_URL, help="URL sqlite:/// do principal")
+    parser.add_argument("--destino", default=REPLICA_URL, help="URL sqlite:/// da réplica")
+    parser.add_argument("--intervalo", type=float, default=0, help="repete a cada N segundos (0 = uma vez)")
+    args = parser.parse_args()
+
+    origem, destino = _arquivo_sqlite(args.origem), _arquivo_sqlite(args.destino)
+    while True:
+        inicio = time.perf_counter()
+        copiar(origem, destino)
+        print(f"🪞 {origem} → {destino} em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        if not args.intervalo:
+            sys.exit(0)
+        time.sleep(args.intervalo)
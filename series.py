@@ -0,0 +1,215 @@
+import json
+import threading
+import zlib
+
+import numpy as np
+
+import models
+
+# ==========================================================
+# 📉 SÉRIES DE LEITURAS REDUZIDAS PARA GRÁFICOS (LTTB)
+# ==========================================================
+# Busca as leituras de um item do catálogo (todas as versões, incluindo os
+# checklists arquivados) e reduz a série a um número máximo de pontos com o
+# algoritmo Largest-Triangle-Three-Buckets, que mantém o formato da curva.
+# Em cada bucket com leitura fora da faixa (valor_min/valor_max) entram as
+# leituras mais distantes da faixa, uma acima e uma abaixo, para que desvios
+# nunca sumam do gráfico.
+#
+# Um checklist arquivado não muda mais: as leituras do item pedido (valor,
+# mínimo e máximo) ficam em cache por (item_id, checklist_id), e as próximas
+# séries do mesmo item e período não abrem o blob de novo. O cache é limitado
+# pelo total de leituras guardadas, não pelo número de checklists.
+
+CACHE_LEITURAS = 200_000                # leituras arquivadas mantidas em memória
+
+_cache_arquivos = {}                    # (item_id, checklist_id) → ((valor, min, max), ...)
+_em_cache = {"leituras": 0}
+_lock = threading.Lock()
+
+
+def _leituras_quentes(db, item_id, inicio, fim):
+    return (
+        db.query(
+            models.Checklist.data_criacao,
+            models.ItemRegistro.valor_registrado,
+            models.ItemModelo.valor_min,
+            models.ItemModelo.valor_max,
+        )
+        .join(models.ItemRegistro, models.ItemRegistro.checklist_id == models.Checklist.id)
+        .join(models.ItemModelo, models.ItemRegistro.modelo_id == models.ItemModelo.id)
+        .filter(
+            models.ItemModelo.item_id == item_id,
+            models.ItemRegistro.valor_registrado.isnot(None),
+            models.Checklist.data_criacao >= inicio,
+            models.Checklist.data_criacao < fim,
+        )
+        .all()
+    )
+
+
+def _leituras_arquivadas(db, item_id, inicio, fim):
+    # Só os arquivos que têm leitura do item (checklist_arquivo_itens)
+    arquivados = (
+        db.query(models.Checklist.id, models.Checklist.data_criacao)
+        .join(models.ChecklistArquivoItem, models.ChecklistArquivoItem.checklist_id == models.Checklist.id)
+        .filter(
+            models.ChecklistArquivoItem.item_id == item_id,
+            models.Checklist.data_criacao >= inicio,
+            models.Checklist.data_criacao < fim,
+        )
+        .all()
+    )
+    if not arquivados:
+        return []
+    colunas = _colunas_arquivos(db, item_id, [checklist_id for checklist_id, _ in arquivados])
+
+    return [
+        (data, valor, minimo, maximo)
+        for checklist_id, data in arquivados
+        for valor, minimo, maximo in colunas[checklist_id]
+    ]
+
+
+def _colunas_arquivos(db, item_id, checklist_ids):
+    """{checklist_id: leituras do item com valor}, descomprimindo só o que não está no cache."""
+    with _lock:
+        encontrados = {
+            cid: _cache_arquivos[(item_id, cid)] for cid in checklist_ids if (item_id, cid) in _cache_arquivos
+        }
+    faltando = [cid for cid in checklist_ids if cid not in encontrados]
+    if not faltando:
+        return encontrados
+
+    # Arquivos da versão 1 não têm item_id: casam por sistema/descrição de qualquer versão do item
+    versoes = set(
+        db.query(models.ItemModelo.sistema, models.ItemModelo.descricao)
+        .filter(models.ItemModelo.item_id == item_id)
+        .all()
+    )
+    for n in range(0, len(faltando), 500):
+        blobs = (
+            db.query(models.ChecklistArquivo.checklist_id, models.ChecklistArquivo.dados)
+            .filter(models.ChecklistArquivo.checklist_id.in_(faltando[n:n + 500]))
+        )
+        for checklist_id, dados in blobs:
+            # Lê só as colunas necessárias, sem montar os objetos de arquivo.descompactar
+            registros = json.loads(zlib.decompress(dados))["registros"]
+            do_item = [
+                i == item_id if i is not None else chave in versoes
+                for i, chave in zip(
+                    registros.get("item_id") or [None] * len(registros["sistema"]),
+                    zip(registros["sistema"], registros["descricao"]),
+                )
+            ]
+            leituras = tuple(
+                linha for linha, casa in zip(
+                    zip(registros["valor_registrado"], registros["valor_min"], registros["valor_max"]), do_item
+                )
+                if casa and linha[0] is not None
+            )
+            encontrados[checklist_id] = leituras
+            _guardar(item_id, checklist_id, leituras)
+    return encontrados
+
+
+def _guardar(item_id, checklist_id, leituras):
+    with _lock:
+        if (item_id, checklist_id) in _cache_arquivos:
+            return
+        # Checklist sem leitura também conta um, para o vazio não ficar de graça
+        _cache_arquivos[(item_id, checklist_id)] = leituras
+        _em_cache["leituras"] += max(len(leituras), 1)
+        while _em_cache["leituras"] > CACHE_LEITURAS:
+            chave = next(iter(_cache_arquivos))                    # sai o mais antigo
+            _em_cache["leituras"] -= max(len(_cache_arquivos.pop(chave)), 1)
+
+
+def limpar_cache():
+    with _lock:
+        _cache_arquivos.clear()
+        _em_cache["leituras"] = 0
+
+
+def desvio_faixa(valores, minimos, maximos):
+    """Quanto cada leitura passou da faixa: positivo acima do máximo, negativo
+    abaixo do mínimo, 0 quando dentro ou sem limite."""
+    abaixo = np.where(np.isnan(minimos), 0.0, minimos - valores)
+    acima = np.where(np.isnan(maximos), 0.0, valores - maximos)
+    return np.where(acima > 0, acima, np.where(abaixo > 0, -abaixo, 0.0))
+
+
+def _bordas(total, buckets, desvio):
+    """Bordas dos buckets e quantos deles têm desvio dos dois lados da faixa."""
+    bordas = np.linspace(1, total - 1, buckets + 1).astype(np.int64)
+    if desvio is None:
+        return bordas, 0
+    inicios = bordas[:-1]
+    acima = np.maximum.reduceat(desvio[1:total - 1], inicios - 1) > 0
+    abaixo = np.minimum.reduceat(desvio[1:total - 1], inicios - 1) < 0
+    return bordas, int(np.count_nonzero(acima & abaixo))
+
+
+def lttb(x, y, limite, desvio=None):
+    """Índices dos pontos escolhidos pelo LTTB (o primeiro e o último sempre entram).
+
+    Bucket com leitura fora da faixa fica com a pior de cada lado (acima do
+    máximo e abaixo do mínimo); os buckets diminuem o quanto for preciso para
+    o total não passar de limite.
+    """
+    total = len(x)
+    if limite >= total or limite < 3:
+        return np.arange(total)
+
+    buckets = limite - 2
+    bordas, duplos = _bordas(total, buckets, desvio)
+    while buckets > 1 and buckets + duplos > limite - 2:
+        buckets = limite - 2 - duplos
+        bordas, duplos = _bordas(total, buckets, desvio)
+
+    escolhidos = [0]
+    anterior = 0
+    for k in range(buckets):
+        inicio, fim = bordas[k], bordas[k + 1]
+        proximo_fim = bordas[k + 2] if k + 2 < len(bordas) else total
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+
+        trecho = desvio[inicio:fim] if desvio is not None else None
+        if trecho is not None and (trecho.max() > 0 or trecho.min() < 0):
+            pontos = {inicio + int(np.argmax(trecho))} if trecho.max() > 0 else set()
+            if trecho.min() < 0:
+                pontos.add(inicio + int(np.argmin(trecho)))
+            escolhidos.extend(sorted(pontos))
+        else:
+            areas = np.abs(
+                (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+            )
+            escolhidos.append(inicio + int(np.argmax(areas)))
+        anterior = escolhidos[-1]
+    escolhidos.append(total - 1)
+    return np.array(escolhidos, dtype=np.int64)
+
+
+def serie_item(db, item_id, inicio, fim, pontos=500):
+    leituras = _leituras_quentes(db, item_id, inicio, fim) + _leituras_arquivadas(db, item_id, inicio, fim)
+    leituras.sort(key=lambda leitura: leitura[0])
+
+    datas = [leitura[0] for leitura in leituras]
+    x = np.array([data.timestamp() for data in datas], dtype=np.float64)
+    y = np.array([leitura[1] for leitura in leituras], dtype=np.float64)
+    minimos = np.array([leitura[2] for leitura in leituras], dtype=np.float64)
+    maximos = np.array([leitura[3] for leitura in leituras], dtype=np.float64)
+    desvio = desvio_faixa(y, minimos, maximos)
+
+    indices = lttb(x, y, pontos, desvio)
+    return {
+        "total_leituras": len(leituras),
+        "total_fora_faixa": int(np.count_nonzero(desvio)),
+        "pontos": {
+            "datas": [datas[i].strftime("%Y-%m-%dT%H:%M:%S") for i in indices],
+            "valores": y[indices].tolist(),
+            "fora_faixa": (desvio[indices] != 0).tolist(),
+        },
+    }
@@ -0,0 +1,222 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# ==========================================================
+# 🚀 SERVIDOR COM VÁRIOS WORKERS (ENTRADA DO .EXE E DO SERVIÇO)
+# ==========================================================
+# Abre a porta uma vez e reparte o socket entre N processos uvicorn, para um
+# PDF pesado ou uma consulta lenta não travar todo mundo e o servidor usar
+# mais de um núcleo.
+#
+#   python servidor.py --workers 4 --porta 8000 --conexoes 40
+#
+# - Preload (Linux): o processo principal importa main.py uma vez (templates,
+#   modelos, NumPy, WeasyPrint, create_all) e os workers nascem por fork,
+#   compartilhando esse código. Cada worker descarta as conexões herdadas.
+#   No Windows não existe fork: cada worker importa a aplicação sozinho.
+# - Conexões: --conexoes é o total de conexões ao banco, dividido entre os
+#   workers (CHECKLIST_DB_POOL por worker, sem overflow).
+# - Reinício gradual: `kill -HUP <pid>` sobe um worker novo, espera ele ficar
+#   pronto e só então encerra o antigo (que termina as requisições em curso).
+#   Com --sem-preload o worker novo importa main.py de novo (código atualizado).
+# - /saude e /pronto (main.py) para o serviço/balanceador.
+#
+# Eventos ao vivo dos dashboards: com mais de um worker, eventos.py passa os
+# eventos por eventos_painel, e cada dashboard recebe as gravações de todos.
+
+PODE_FORK = "fork" in multiprocessing.get_all_start_methods()
+_sinais = {"parar": False, "reiniciar": False}
+
+
+def _opcoes():
+    parser = argparse.ArgumentParser(description="Inicia o Checklist Energy com vários workers.")
+    parser.add_argument("--host", default=os.getenv("CHECKLIST_HOST", "0.0.0.0"))
+    parser.add_argument("--porta", type=int, default=int(os.getenv("CHECKLIST_PORTA", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CHECKLIST_WORKERS", "1")))
+    parser.add_argument("--conexoes", type=int, default=int(os.getenv("CHECKLIST_DB_CONEXOES", "0")),
+                        help="total de conexões ao banco para todos os workers (0 = padrão do SQLAlchemy por worker)")
+    parser.add_argument("--sem-preload", action="store_true", help="cada worker importa a aplicação sozinho")
+    parser.add_argument("--timeout-desligar", type=int, default=30,
+                        help="segundos para terminar as requisições em curso ao parar um worker")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def abrir_socket(host, porta):
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, porta))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def dividir_conexoes(conexoes, workers):
+    """Precisa rodar antes de importar database.py (o engine lê o ambiente)."""
+    if conexoes > 0:
+        os.environ["CHECKLIST_DB_POOL"] = str(max(1, conexoes // workers))
+        os.environ["CHECKLIST_DB_POOL_EXTRA"] = "0"
+
+
+def _descartar_conexoes_herdadas():
+    import database
+
+    # Conexões abertas pelo processo principal não podem ser usadas pelo filho
+    database.engine.dispose(close=False)
+    if database.engine_leitura is not database.engine:
+        database.engine_leitura.dispose(close=False)
+
+
+# ==========================================================
+# 👷 WORKER
+# ==========================================================
+def servir(sock, numero, opcoes, pronto):
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)      # reinício é com o processo principal
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    os.environ["CHECKLIST_WORKER"] = str(numero)
+
+    import uvicorn
+
+    ja_carregado = "main" in sys.modules
+    import main
+
+    if ja_carregado:
+        _descartar_conexoes_herdadas()
+
+    servidor = uvicorn.Server(uvicorn.Config(
+        main.app,
+        log_level=opcoes["log_level"],
+        timeout_graceful_shutdown=opcoes["timeout_desligar"],
+    ))
+
+    def avisar_pronto():
+        while not servidor.started and not servidor.should_exit:
+            time.sleep(0.05)
+        pronto.set()
+
+    threading.Thread(target=avisar_pronto, daemon=True).start()
+    servidor.run(sockets=[sock])
+
+
+# ==========================================================
+# 🧭 PROCESSO PRINCIPAL
+# ==========================================================
+class Supervisor:
+    def __init__(self, sock, opcoes, contexto):
+        self.sock = sock
+        self.opcoes = opcoes
+        self.contexto = contexto
+        self.workers = {}                # número → (processo, iniciado_em)
+        self.saindo = []                 # workers antigos terminando as requisições
+
+    def iniciar(self, numero):
+        pronto = self.contexto.Event()
+        processo = self.contexto.Process(
+            target=servir, args=(self.sock, numero, self.opcoes, pronto), name=f"worker-{numero}"
+        )
+        processo.start()
+        return processo, pronto
+
+    def parar(self, processo):
+        if processo.is_alive():
+            processo.terminate()         # SIGTERM: o uvicorn encerra de forma gradual
+
+    def subir_todos(self):
+        for numero in range(1, self.opcoes["workers"] + 1):
+            processo, _ = self.iniciar(numero)
+            self.workers[numero] = (processo, time.monotonic())
+        print(f"🚀 {len(self.workers)} worker(s) em {self.opcoes['host']}:{self.opcoes['porta']} "
+              f"(pid principal {os.getpid()})")
+
+    def reiniciar_gradual(self):
+        print("🔄 Reinício gradual dos workers")
+        for numero, (antigo, _) in list(self.workers.items()):
+            novo, pronto = self.iniciar(numero)
+            if not pronto.wait(120) or not novo.is_alive():
+                print(f"⚠️ Worker {numero} novo não ficou pronto; o antigo continua atendendo")
+                self.parar(novo)
+                continue
+            self.workers[numero] = (novo, time.monotonic())
+            self.parar(antigo)
+            self.saindo.append(antigo)
+            print(f"✅ Worker {numero}: pid {antigo.pid} → {novo.pid}")
+
+    def vigiar(self):
+        """Repõe workers que morreram; devolve quando pedirem para parar."""
+        while not _sinais["parar"]:
+            if _sinais["reiniciar"]:
+                _sinais["reiniciar"] = False
+                self.reiniciar_gradual()
+            self.saindo = [p for p in self.saindo if p.is_alive()]
+            for numero, (processo, iniciado_em) in list(self.workers.items()):
+                if processo.is_alive():
+                    continue
+                print(f"⚠️ Worker {numero} (pid {processo.pid}) saiu com código {processo.exitcode}; reiniciando")
+                if time.monotonic() - iniciado_em < 5:
+                    time.sleep(1)        # evita laço de reinício quando a aplicação nem sobe
+                novo, _ = self.iniciar(numero)
+                self.workers[numero] = (novo, time.monotonic())
+            time.sleep(0.5)
+
+    def encerrar(self):
+        processos = [p for p, _ in self.workers.values()] + self.saindo
+        for processo in processos:
+            self.parar(processo)
+        limite = time.monotonic() + self.opcoes["timeout_desligar"] + 5
+        for processo in processos:
+            processo.join(max(limite - time.monotonic(), 0))
+            if processo.is_alive():
+                processo.kill()
+        print("🛑 Servidor encerrado")
+
+
+def _pedir(chave):
+    def tratar(sinal, quadro):
+        _sinais[chave] = True
+    return tratar
+
+
+def main():
+    opcoes = vars(_opcoes())
+    opcoes["workers"] = max(1, opcoes["workers"])
+    dividir_conexoes(opcoes["conexoes"], opcoes["workers"])
+    os.environ["CHECKLIST_WORKERS"] = str(opcoes["workers"])     # eventos.py: repasse entre workers
+
+    sock = abrir_socket(opcoes["host"], opcoes["porta"])
+    if PODE_FORK:
+        contexto = multiprocessing.get_context("fork")
+        if not opcoes["sem_preload"]:
+            import database
+            import main as aplicacao  # noqa: F401  (preload: os workers herdam por fork)
+
+            database.engine.dispose()
+            database.engine_leitura.dispose()
+    else:
+        contexto = multiprocessing.get_context("spawn")
+
+    signal.signal(signal.SIGTERM, _pedir("parar"))
+    signal.signal(signal.SIGINT, _pedir("parar"))
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _pedir("reiniciar"))
+
+    supervisor = Supervisor(sock, opcoes, contexto)
+    supervisor.subir_todos()
+    try:
+        supervisor.vigiar()
+    finally:
+        supervisor.encerrar()
+        sock.close()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()     # .exe (PyInstaller) no Windows
+    main()
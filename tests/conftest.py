@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# ==========================================================
+# 🧪 BANCO DOS TESTES: SQLITE TEMPORÁRIO
+# ==========================================================
+# database.py lê CHECKLIST_DB_URL no import, então o banco é definido antes
+# de qualquer módulo do sistema ser importado.
+_PASTA = tempfile.mkdtemp(prefix="checklist_testes_")
+os.environ["CHECKLIST_DB_URL"] = "sqlite:///" + os.path.join(_PASTA, "testes.db").replace(os.sep, "/")
+os.environ.pop("CHECKLIST_DB_REPLICA_URL", None)
+os.environ["CHECKLIST_SINCRONIZAR"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import models  # noqa: E402
+import modelos  # noqa: E402
+import series  # noqa: E402
+
+
+def recriar_tabelas(engine):
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("DROP TABLE IF EXISTS indice_busca_fts")
+    models.Base.metadata.create_all(bind=engine)
+    # Conexões do pool guardam o esquema antigo (PRAGMA index_list não recarrega)
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    """Sessão num banco recém-criado (tabelas e caches zerados)."""
+    recriar_tabelas(database.engine)
+    modelos.limpar_cache()
+    series.limpar_cache()
+    sessao = database.SessionLocal()
+    yield sessao
+    sessao.close()
+
+
+@pytest.fixture
+def cliente(db):
+    """TestClient da aplicação no mesmo banco da fixture db."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    return TestClient(main.app)
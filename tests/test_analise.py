@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import analise
+import models
+import modelos
+
+
+def _checklist(db, sistema, quando, equipamentos=()):
+    item = db.query(models.ItemChecklist).filter_by(sistema=sistema).first()
+    if item is None:
+        item = models.ItemChecklist(sistema=sistema, descricao="Leitura", unidade="bar")
+        db.add(item)
+        db.commit()
+    versao = modelos.modelos_vigentes(db, [item])[item.id]
+
+    checklist = models.Checklist(tecnico="Ana", turno="1°", data_criacao=quando)
+    db.add(checklist)
+    db.flush()
+    db.add(models.ItemRegistro(checklist_id=checklist.id, modelo_id=versao, valor_registrado=7.0,
+                               status_ok=True))
+    # Formato antigo: uma linha por equipamento marcado, nenhuma quando nada operava
+    db.add_all([
+        models.StatusOperacaoChecklist(checklist_id=checklist.id, nome_equipamento=nome, status="Operando")
+        for nome in equipamentos
+    ])
+    db.commit()
+    return checklist.id
+
+
+def test_utilizacao_conta_checklist_sem_equipamento_marcado(db):
+    inicio = datetime(2024, 5, 1)
+    com_torre = _checklist(db, "Água Gelada", inicio + timedelta(hours=7), ["Torre 01"])
+    sem_nada = _checklist(db, "Água Gelada", inicio + timedelta(hours=15))
+    _checklist(db, "denso", inicio + timedelta(hours=16))          # supplier não entra
+
+    resultado = analise.heatmap_operacao(db, inicio, inicio + timedelta(days=1))
+
+    assert resultado["total_checklists"] == 2
+    assert resultado["heatmap"]["checklist_ids"] == [com_torre, sem_nada]
+    torre = next(e for e in resultado["equipamentos"] if e["nome"] == "Torre 01")
+    assert torre["utilizacao"] == 0.5
+
+
+def test_turno_da_noite_fica_numa_coluna_so(db):
+    inicio = datetime(2024, 5, 1)
+    for horas, turno in ((7, "1°"), (23, "3°"), (29, "3°"), (31, "1°")):   # 29h = 02/05 05:00
+        checklist = _checklist(db, "Água Gelada", inicio + timedelta(hours=horas), ["Torre 01"])
+        db.get(models.Checklist, checklist).turno = turno
+    db.commit()
+
+    resultado = analise.heatmap_operacao(db, inicio, inicio + timedelta(days=2), agrupar="turno")
+
+    assert resultado["heatmap"]["colunas"] == ["01/05/2024 1°", "01/05/2024 3°", "02/05/2024 1°"]
+
+
+def test_data_do_turno():
+    assert analise.data_do_turno(datetime(2024, 5, 2, 1, 30), "3°").day == 1
+    assert analise.data_do_turno(datetime(2024, 5, 1, 23, 0), "3° Turno").day == 1
+    assert analise.data_do_turno(datetime(2024, 5, 2, 5, 50), "1°").day == 2
+    assert analise.data_do_turno(datetime(2024, 5, 2, 1, 30), None).day == 2
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import arquivo
+import frota
+import models
+import modelos
+
+
+def _checklist_antigo(db, dias=400):
+    itens = [
+        models.ItemChecklist(sistema="Água Gelada", descricao="Temperatura de saída", unidade="°C",
+                             valor_min=5.0, valor_max=12.0),
+        models.ItemChecklist(sistema="Ar Comprimido", descricao="Pressão da linha", unidade="bar",
+                             valor_min=6.0, valor_max=8.0),
+    ]
+    db.add_all(itens)
+    db.commit()
+    versoes = modelos.modelos_vigentes(db, itens)
+
+    checklist = models.Checklist(tecnico="Ana", turno="1°", data_criacao=datetime.now() - timedelta(days=dias))
+    db.add(checklist)
+    db.flush()
+    db.add_all([
+        models.ItemRegistro(checklist_id=checklist.id, modelo_id=versoes[itens[0].id],
+                            valor_registrado=7.5, status_ok=True),
+        models.ItemRegistro(checklist_id=checklist.id, modelo_id=versoes[itens[1].id],
+                            valor_registrado=None, status_ok=False, comentario="Vazamento na válvula"),
+    ])
+    # Equipamentos no formato antigo (uma linha por equipamento)
+    db.add_all([
+        models.StatusOperacaoChecklist(checklist_id=checklist.id, nome_equipamento=nome, tipo=tipo,
+                                       status="Operando", data_registro=datetime(2024, 5, 1, 7, 30))
+        for nome, tipo in (("Torre 03", "Torre"), ("Cp 02", "Compressor"))
+    ])
+    db.commit()
+    return checklist.id
+
+
+def test_compactar_descompactar_preserva_linhas():
+    registros = [
+        SimpleNamespace(id=1, sistema="Água Gelada", descricao="Temperatura", unidade="°C", valor_min=5.0,
+                        valor_max=12.0, valor_registrado=7.25, status_ok=True, comentario=None, item_id=3),
+        SimpleNamespace(id=2, sistema="denso", descricao="Pressão", unidade="bar", valor_min=None,
+                        valor_max=None, valor_registrado=None, status_ok=None, comentario="ção", item_id=None),
+    ]
+    operacoes = [
+        SimpleNamespace(id=9, nome_equipamento="Torre 01", tipo="Torre", status="Operando", tecnico="Ana",
+                        turno="1°", data_registro=datetime(2024, 1, 2, 3, 4, 5)),
+    ]
+    dados, tamanho_bruto = arquivo.compactar(registros, operacoes)
+    assert len(dados) < tamanho_bruto
+
+    lidos, ops = arquivo.descompactar(dados)
+    assert [vars(r) for r in lidos] == [vars(r) for r in registros]
+    assert [vars(o) for o in ops] == [vars(o) for o in operacoes]
+
+
+def test_compactar_checklist_vazio():
+    registros, operacoes = arquivo.descompactar(arquivo.compactar([], [])[0])
+    assert registros == [] and operacoes == []
+
+
+def test_arquivar_e_carregar_devolve_o_mesmo_checklist(db):
+    checklist_id = _checklist_antigo(db)
+    antes_registros, antes_operacoes = arquivo.carregar_checklist(db, checklist_id)
+    antes = [(r.sistema, r.descricao, r.valor_registrado, r.status_ok, r.comentario) for r in antes_registros]
+    nomes_antes = sorted(o.nome_equipamento for o in antes_operacoes)
+
+    resumo = arquivo.arquivar_antigos(db, dias=365)
+    assert resumo["checklists"] == 1 and resumo["registros"] == 2 and resumo["operacoes"] == 2
+    db.expire_all()
+
+    # Linhas quentes removidas na mesma transação do arquivo
+    assert db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id).count() == 0
+    assert db.query(models.StatusOperacaoChecklist).filter_by(checklist_id=checklist_id).count() == 0
+    assert db.get(models.ChecklistArquivo, checklist_id).local == "main"
+
+    registros, operacoes = arquivo.carregar_checklist(db, checklist_id)
+    assert [(r.sistema, r.descricao, r.valor_registrado, r.status_ok, r.comentario) for r in registros] == antes
+    # Os equipamentos antigos viram mapa de bits e voltam com os mesmos nomes
+    assert sorted(o.nome_equipamento for o in operacoes) == nomes_antes
+    assert frota.decodificar(db.get(models.OperacaoChecklist, checklist_id).mapa)["torre"] == 0b100
+
+
+def test_arquivar_ignora_checklists_recentes(db):
+    checklist_id = _checklist_antigo(db, dias=10)
+    assert arquivo.arquivar_antigos(db, dias=365)["checklists"] == 0
+    assert db.query(models.ItemRegistro).filter_by(checklist_id=checklist_id).count() == 2
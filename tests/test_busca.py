@@ -0,0 +1,21 @@
+import busca
+
+
+def test_normalizar_remove_acentos_maiusculas_e_pontuacao():
+    assert busca.normalizar_texto("Vazamento ÓLEO!") == "vazamento oleo"
+    assert busca.normalizar_texto("  Pressão   alta, compressor nº 3 ") == "pressao alta compressor no 3"
+
+
+def test_normalizar_texto_vazio():
+    assert busca.normalizar_texto(None) == ""
+    assert busca.normalizar_texto("") == ""
+
+
+def test_termos_ignoram_stopwords():
+    assert busca.termos_consulta("Vazamento de óleo na bomba", "sqlite") == ["vazamento", "oleo", "bomba"]
+
+
+def test_termos_mysql_ignoram_tokens_curtos():
+    # O FULLTEXT do InnoDB não indexa tokens menores que innodb_ft_min_token_size
+    assert busca.termos_consulta("ar frio", "sqlite") == ["ar", "frio"]
+    assert busca.termos_consulta("ar frio", "mysql") == ["frio"]
@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+import eventos
+import models
+
+
+def test_evento_de_outro_worker_chega_aos_assinantes_deste(db):
+    outro_worker = eventos.CanalEventos(compartilhado=True)
+    este_worker = eventos.CanalEventos(compartilhado=True)
+
+    async def cenario():
+        # Sem iniciar a thread de leitura: o teste chama repassar_novos direto
+        este_worker._leitor_pid = os.getpid()
+        assinatura = este_worker.assinar()
+        ultimo = este_worker.repassar_novos(None)
+
+        outro_worker.publicar("status", {"equipamentos": [{"id": 7, "status": "NOK"}]})
+        ultimo = este_worker.repassar_novos(ultimo)
+        await asyncio.sleep(0)                         # entrega via call_soon_threadsafe
+        return ultimo, assinatura[1].get_nowait()
+
+    ultimo, mensagem = asyncio.run(cenario())
+
+    assert mensagem == 'event: status\ndata: {"equipamentos": [{"id": 7, "status": "NOK"}]}\n\n'
+    assert ultimo == db.query(models.EventoPainel.id).scalar()
+    assert este_worker.repassar_novos(ultimo) == ultimo     # nada repetido
+
+
+def test_um_worker_entrega_direto_sem_gravar(db):
+    canal = eventos.CanalEventos(compartilhado=False)
+    assert not canal.ativo
+
+    async def cenario():
+        assinatura = canal.assinar()
+        canal.publicar("checklist", {"checklist_id": 1})
+        await asyncio.sleep(0)
+        return assinatura[1].get_nowait()
+
+    assert asyncio.run(cenario()).startswith("event: checklist\n")
+    assert db.query(models.EventoPainel).count() == 0
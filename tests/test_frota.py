@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import frota
+import models
+
+
+def _linhas(*nomes):
+    return [SimpleNamespace(nome_equipamento=nome) for nome in nomes]
+
+
+def test_codificar_decodificar_ida_e_volta():
+    mascaras = {t.chave: 0 for t in frota.FROTA}
+    mascaras.update(torre=0b100000000001, cp=0b1000000, secador=0b111)
+    mapa = frota.codificar(mascaras)
+
+    assert mapa == "torre:801,cp:40,secador:7"      # tipos zerados não são gravados
+    assert frota.decodificar(mapa) == mascaras
+
+
+def test_decodificar_mapa_vazio():
+    assert frota.decodificar("") == {t.chave: 0 for t in frota.FROTA}
+    assert frota.decodificar(None) == {t.chave: 0 for t in frota.FROTA}
+    assert frota.codificar(frota.decodificar("")) == ""
+
+
+def test_ler_formulario_e_numeros():
+    form = {"torre_1": "on", "torre_12": "on", "bag_3": "on", "chiller_10": "on"}  # chiller só vai até 9
+    mascaras = frota.ler_formulario(form)
+
+    assert frota.numeros(mascaras["torre"]) == [1, 12]
+    assert frota.numeros(mascaras["bag"]) == [3]
+    assert mascaras["chiller"] == 0
+    assert frota.decodificar(frota.codificar(mascaras)) == mascaras
+
+
+def test_legado_aceita_os_prefixos_antigos():
+    mascaras = frota.mascaras_de_legado(_linhas("Cp 03", "Compressor 01", "Torre 12", "bac 02"))
+    assert frota.numeros(mascaras["cp"]) == [1, 3]
+    assert frota.numeros(mascaras["torre"]) == [12]
+    assert frota.numeros(mascaras["bac"]) == [2]
+
+
+def test_legado_ignora_e_anota_nomes_fora_da_frota():
+    invalidos = []
+    mascaras = frota.mascaras_de_legado(
+        _linhas("Torre 00", "Bomba", "Cp 99", "Xyz 01", None, "Cp 03"), invalidos
+    )
+    assert frota.numeros(mascaras["cp"]) == [3]
+    assert sum(mascaras.values()) == 1 << 2
+    assert invalidos == ["Torre 00", "Bomba", "Cp 99", "Xyz 01", None]
+
+
+def test_converter_legado_nao_para_em_nome_invalido(db):
+    checklist = models.Checklist(tecnico="Ana")
+    db.add(checklist)
+    db.flush()
+    db.add_all([
+        models.StatusOperacaoChecklist(checklist_id=checklist.id, nome_equipamento=nome)
+        for nome in ("Torre 00", "Torre 02", "Chiller 9")
+    ])
+    db.commit()
+
+    assert frota.converter_legado(db) == 1
+    mascaras = frota.decodificar(db.get(models.OperacaoChecklist, checklist.id).mapa)
+    assert frota.numeros(mascaras["torre"]) == [2]
+    assert frota.numeros(mascaras["chiller"]) == [9]
+    assert db.query(models.StatusOperacaoChecklist).count() == 0
+
+
+def test_equipamentos_operando_usa_os_nomes_antigos():
+    antigos = _linhas("Torre 03", "Cp 02", "Bac 10", "Bag 01", "Chiller 09", "Secador 01")
+    lista = frota.equipamentos_operando(frota.codificar(frota.mascaras_de_legado(antigos)))
+
+    assert sorted(e.nome_equipamento for e in lista) == sorted(o.nome_equipamento for o in antigos)
+    assert {e.nome_equipamento: e.tipo for e in lista}["Cp 02"] == "Compressor"
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import idempotencia
+import models
+
+
+@pytest.fixture
+def cliente(cliente, db):
+    db.add(models.ItemChecklist(sistema="Água Gelada", descricao="Temperatura de saída", unidade="°C",
+                                valor_min=5.0, valor_max=12.0))
+    db.commit()
+    return cliente
+
+
+def _formulario(db, chave):
+    item = db.query(models.ItemChecklist).first()
+    return {"tecnico": "Ana", "turno": "1°", "chave_envio": chave,
+            f"valor_{item.id}": "7.5", f"ok_{item.id}": "on", "torre_1": "on"}
+
+
+def _enviar(cliente, formulario):
+    return cliente.post("/salvar_main", data=formulario, follow_redirects=False)
+
+
+def test_mesma_chave_enviada_duas_vezes_grava_um_checklist(db, cliente):
+    formulario = _formulario(db, idempotencia.nova_chave())
+
+    assert _enviar(cliente, formulario).status_code == 303
+    assert _enviar(cliente, formulario).status_code == 303
+
+    assert db.query(models.Checklist).count() == 1
+    assert db.query(models.ItemRegistro).count() == 1
+    checklist_id = db.query(models.Checklist.id).scalar()
+    assert idempotencia.ja_processado(db, formulario["chave_envio"]) == checklist_id
+
+
+def test_mesma_chave_enviada_ao_mesmo_tempo_grava_um_checklist(db, cliente):
+    formulario = _formulario(db, idempotencia.nova_chave())
+    largada = threading.Barrier(4)
+    respostas = []
+
+    def enviar():
+        largada.wait()
+        respostas.append(_enviar(cliente, formulario).status_code)
+
+    envios = [threading.Thread(target=enviar) for _ in range(4)]
+    for envio in envios:
+        envio.start()
+    for envio in envios:
+        envio.join()
+
+    assert respostas == [303] * 4
+    db.expire_all()
+    assert db.query(models.Checklist).count() == 1
+    assert db.query(models.ItemRegistro).count() == 1
+    assert db.query(models.ChaveIdempotencia).count() == 1
+
+
+def test_chaves_diferentes_gravam_checklists_separados(db, cliente):
+    _enviar(cliente, _formulario(db, idempotencia.nova_chave()))
+    _enviar(cliente, _formulario(db, idempotencia.nova_chave()))
+    assert db.query(models.Checklist).count() == 2
+
+
+def test_podar_apaga_so_as_chaves_vencidas(db, monkeypatch):
+    monkeypatch.setitem(idempotencia._ultima_poda, "em", 0.0)
+    agora = datetime.now()
+    db.add_all([
+        models.ChaveIdempotencia(chave="vencida-01", checklist_id=1, expira_em=agora - timedelta(minutes=1)),
+        models.ChaveIdempotencia(chave="valida-001", checklist_id=2, expira_em=agora + timedelta(hours=1)),
+    ])
+    db.commit()
+
+    idempotencia.podar(db)
+    assert [c.chave for c in db.query(models.ChaveIdempotencia)] == ["valida-001"]
+
+    # Dentro do intervalo a poda não roda de novo
+    db.add(models.ChaveIdempotencia(chave="vencida-02", checklist_id=3, expira_em=agora - timedelta(minutes=1)))
+    db.commit()
+    idempotencia.podar(db)
+    assert db.query(models.ChaveIdempotencia).count() == 2
@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, text
+
+import database
+import migracao_indices
+
+
+def _indices(tabela):
+    return {i["name"] for i in inspect(database.engine).get_indexes(tabela)}
+
+
+def test_cria_indices_que_faltam_em_banco_antigo(db):
+    # Banco criado antes dos índices: create_all não os acrescenta
+    with database.engine.begin() as conn:
+        for indice in ("ix_checklist_data_criacao", "ix_itens_registro_checklist_id",
+                       "ix_status_operacao_checklist_checklist_id"):
+            conn.execute(text(f"DROP INDEX {indice}"))
+
+    assert migracao_indices.criar_indices() == 3
+    assert "ix_checklist_data_criacao" in _indices("checklist")
+    assert "ix_itens_registro_checklist_id" in _indices("itens_registro")
+    assert "ix_status_operacao_checklist_checklist_id" in _indices("status_operacao_checklist")
+
+    assert migracao_indices.criar_indices() == 0
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+
+import database
+import migracao_modelos
+
+
+def test_banco_novo_passa_na_verificacao(db):
+    migracao_modelos.verificar_esquema()
+
+
+def test_banco_sem_modelo_id_nao_sobe(db):
+    # itens_registro como era antes das versões de item
+    with database.engine.begin() as conn:
+        conn.execute(text("DROP TABLE itens_registro"))
+        conn.execute(text(
+            "CREATE TABLE itens_registro (id INTEGER PRIMARY KEY, checklist_id INTEGER, sistema VARCHAR(100), "
+            "descricao VARCHAR(255), unidade VARCHAR(20), valor_min FLOAT, valor_max FLOAT, "
+            "valor_registrado FLOAT, status_ok BOOLEAN, comentario VARCHAR(255))"
+        ))
+
+    with pytest.raises(SystemExit, match="migracao_modelos.py"):
+        migracao_modelos.verificar_esquema()
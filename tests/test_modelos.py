@@ -0,0 +1,56 @@
+import models
+import modelos
+
+
+def _item(db, **campos):
+    item = models.ItemChecklist(**{"sistema": "Água Gelada", "descricao": "Temperatura de saída",
+                                   "unidade": "°C", "valor_min": 5.0, "valor_max": 12.0, **campos})
+    db.add(item)
+    db.commit()
+    return item
+
+
+def test_catalogo_sem_mudanca_reaproveita_a_versao(db):
+    item = _item(db)
+    primeira = modelos.modelos_vigentes(db, [item])
+    segunda = modelos.modelos_vigentes(db, [item])
+
+    assert primeira == segunda
+    modelo = db.get(models.ItemModelo, primeira[item.id])
+    assert (modelo.item_id, modelo.versao, modelo.valor_max) == (item.id, 1, 12.0)
+    assert db.query(models.ItemModelo).count() == 1
+
+
+def test_mudanca_no_catalogo_cria_versao_nova_e_preserva_a_antiga(db):
+    item = _item(db)
+    antiga = modelos.modelos_vigentes(db, [item])[item.id]
+
+    item.valor_max = 10.0
+    db.commit()
+    nova = modelos.modelos_vigentes(db, [item])[item.id]
+
+    assert nova != antiga
+    assert db.get(models.ItemModelo, antiga).valor_max == 12.0
+    assert (db.get(models.ItemModelo, nova).versao, db.get(models.ItemModelo, nova).valor_max) == (2, 10.0)
+
+
+def test_voltar_ao_conteudo_anterior_reaproveita_a_versao_existente(db):
+    item = _item(db)
+    original = modelos.modelos_vigentes(db, [item])[item.id]
+    item.unidade = "K"
+    db.commit()
+    modelos.modelos_vigentes(db, [item])
+
+    item.unidade = "°C"
+    db.commit()
+    assert modelos.modelos_vigentes(db, [item])[item.id] == original
+    assert db.query(models.ItemModelo).count() == 2
+
+
+def test_cache_vazio_resolve_pelo_banco_sem_duplicar(db):
+    itens = [_item(db, descricao=f"Item {n}") for n in range(3)]
+    ids = modelos.modelos_vigentes(db, itens)
+
+    modelos.limpar_cache()          # outro processo / reinício do servidor
+    assert modelos.modelos_vigentes(db, itens) == ids
+    assert db.query(models.ItemModelo).count() == 3
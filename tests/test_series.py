@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import arquivo
+import models
+import modelos
+import series
+
+
+def _checklist(db, item, valor, quando, outros=()):
+    versoes = modelos.modelos_vigentes(db, [item, *outros])
+    checklist = models.Checklist(tecnico="Ana", turno="1°", data_criacao=quando)
+    db.add(checklist)
+    db.flush()
+    db.add_all([
+        models.ItemRegistro(checklist_id=checklist.id, modelo_id=versoes[i.id], valor_registrado=valor,
+                            status_ok=True)
+        for i in (item, *outros)
+    ])
+    db.commit()
+
+
+def _itens(db):
+    agua = models.ItemChecklist(sistema="Água Gelada", descricao="Temperatura", unidade="°C",
+                                valor_min=5.0, valor_max=12.0)
+    denso = models.ItemChecklist(sistema="denso", descricao="Pressão", unidade="bar")
+    vapor = models.ItemChecklist(sistema="Vapor", descricao="Pressão", unidade="bar")
+    db.add_all([agua, denso, vapor])
+    db.commit()
+    return agua, denso, vapor
+
+
+def _contar_descompressoes(monkeypatch):
+    chamadas = []
+    original = series.zlib.decompress
+
+    def contar(dados):
+        chamadas.append(1)
+        return original(dados)
+
+    monkeypatch.setattr(series.zlib, "decompress", contar)
+    return chamadas
+
+
+def test_serie_so_abre_os_arquivos_com_o_item(db, monkeypatch):
+    agua, denso, vapor = _itens(db)
+    inicio = datetime.now() - timedelta(days=400)
+    for dia, valor in enumerate([7.0, 13.5, 6.0]):
+        _checklist(db, agua, valor, inicio + timedelta(days=dia))
+    _checklist(db, vapor, 9.0, inicio + timedelta(days=4))
+    _checklist(db, denso, 4.2, inicio + timedelta(days=5))
+    assert arquivo.arquivar_antigos(db, dias=30)["checklists"] == 5
+
+    chamadas = _contar_descompressoes(monkeypatch)
+    fim = inicio + timedelta(days=10)
+
+    assert series.serie_item(db, denso.id, inicio, fim)["pontos"]["valores"] == [4.2]
+    assert len(chamadas) == 1
+
+    serie = series.serie_item(db, agua.id, inicio, fim)
+    assert serie["pontos"]["valores"] == [7.0, 13.5, 6.0]
+    assert serie["total_fora_faixa"] == 1
+    assert len(chamadas) == 4
+
+    # Segunda consulta sai do cache, que guarda só as leituras do item
+    assert series.serie_item(db, agua.id, inicio, fim) == serie
+    assert len(chamadas) == 4
+    assert sorted(series._cache_arquivos.values()) == [((4.2, None, None),)] + [((v, 5.0, 12.0),) for v in (6.0, 7.0, 13.5)]
+
+
+def test_cache_respeita_o_limite_de_leituras(db, monkeypatch):
+    agua, _, _ = _itens(db)
+    inicio = datetime.now() - timedelta(days=400)
+    for dia in range(5):
+        _checklist(db, agua, 7.0 + dia, inicio + timedelta(days=dia))
+    arquivo.arquivar_antigos(db, dias=30)
+    monkeypatch.setattr(series, "CACHE_LEITURAS", 3)
+
+    serie = series.serie_item(db, agua.id, inicio, inicio + timedelta(days=10))
+    assert serie["pontos"]["valores"] == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert len(series._cache_arquivos) == 3 and series._em_cache["leituras"] == 3
+
+
+def test_arquivo_antigo_e_indexado_por_sistema_e_descricao(db):
+    agua, denso, vapor = _itens(db)
+    inicio = datetime.now() - timedelta(days=400)
+    _checklist(db, agua, 7.0, inicio, outros=[vapor])
+    _checklist(db, denso, 4.2, inicio + timedelta(days=1))
+    arquivo.arquivar_antigos(db, dias=30)
+
+    # Como um arquivo da versão 1: sem item_id nas leituras e sem checklist_arquivo_itens
+    for arquivado in db.query(models.ChecklistArquivo):
+        registros, operacoes = arquivo.descompactar(arquivado.dados)
+        for r in registros:
+            del r.item_id
+        arquivado.dados = arquivo.compactar(registros, operacoes)[0]
+    db.query(models.ChecklistArquivoItem).delete()
+    db.commit()
+    assert series.serie_item(db, vapor.id, inicio, inicio + timedelta(days=10))["total_leituras"] == 0
+
+    assert arquivo.indexar_arquivados(db) == 2
+    assert arquivo.indexar_arquivados(db) == 0
+    serie = series.serie_item(db, vapor.id, inicio, inicio + timedelta(days=10))
+    assert serie["pontos"]["valores"] == [7.0]
+
+
+def test_lttb_mantem_desvio_acima_e_abaixo_no_mesmo_bucket():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300) * 2 + 8
+    y[500], y[501] = 20.0, -10.0               # mesmo bucket: um acima e um abaixo de 5–12
+    y[7000] = 13.0
+    desvio = series.desvio_faixa(y, np.full_like(y, 5.0), np.full_like(y, 12.0))
+
+    indices = series.lttb(x, y, 500, desvio)
+
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == 9_999
+    assert {500, 501, 7000} <= set(indices.tolist())
+    assert (np.diff(indices) > 0).all()
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import arquivo
+import database
+import frota
+import models
+import modelos
+import sincronizacao
+
+
+@pytest.fixture
+def estacao(db):
+    """Sessão da estação gravando o log de alterações (o db da fixture é o banco da estação)."""
+    fabrica = sessionmaker(bind=database.engine, info={"registrar_alteracoes": True})
+    with fabrica() as sessao:
+        yield sessao
+
+
+@pytest.fixture
+def central(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'central.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _salvar_checklist(db, quando=None):
+    itens = [
+        models.ItemChecklist(sistema="Água Gelada", descricao="Temperatura de saída", unidade="°C",
+                             valor_min=5.0, valor_max=12.0),
+        models.ItemChecklist(sistema="Ar Comprimido", descricao="Pressão da linha", unidade="bar"),
+    ]
+    db.add_all(itens)
+    db.commit()
+    versoes = modelos.modelos_vigentes(db, itens)
+
+    checklist = models.Checklist(tecnico="Ana", turno="1°", tipo_turno="Normal",
+                                 data_criacao=quando or datetime(2024, 5, 1, 7, 30))
+    db.add(checklist)
+    db.flush()
+    db.add_all([
+        models.ItemRegistro(checklist_id=checklist.id, modelo_id=versoes[itens[0].id],
+                            valor_registrado=7.5, status_ok=True),
+        models.ItemRegistro(checklist_id=checklist.id, modelo_id=versoes[itens[1].id],
+                            status_ok=False, comentario="Vazamento na válvula"),
+        models.OperacaoChecklist(checklist_id=checklist.id,
+                                 mapa=frota.codificar(frota.ler_formulario({"torre_1": "on", "cp_3": "on"}))),
+    ])
+    db.commit()
+    return checklist
+
+
+def _mudar_status(db, nome, novo):
+    equipamento = db.query(models.StatusEquipamento).filter_by(nome_equipamento=nome).first()
+    if equipamento is None:
+        equipamento = models.StatusEquipamento(nome_equipamento=nome, tipo="Torre", status="OK")
+        db.add(equipamento)
+        db.flush()
+    db.add(models.HistoricoStatus(equipamento_id=equipamento.id, status_anterior=equipamento.status,
+                                  status_novo=novo, tecnico="Ana", data_modificacao=datetime(2024, 5, 1, 8)))
+    equipamento.status = novo
+    equipamento.data_atualizacao = datetime(2024, 5, 1, 8)
+    db.commit()
+
+
+def _conteudo(db):
+    """Linhas comparáveis entre os dois bancos (sem os ids, que diferem)."""
+    return {
+        "checklists": [
+            (c.tecnico, c.turno, c.tipo_turno, c.data_criacao)
+            for c in db.query(models.Checklist).order_by(models.Checklist.data_criacao)
+        ],
+        "registros": sorted(
+            (r.modelo.sistema, r.modelo.descricao, r.modelo.valor_max, r.valor_registrado, r.status_ok, r.comentario)
+            for r in db.query(models.ItemRegistro)
+        ),
+        "operacoes": [o.mapa for o in db.query(models.OperacaoChecklist)],
+        "status": [(e.nome_equipamento, e.status) for e in db.query(models.StatusEquipamento)],
+        "historicos": [
+            (h.equipamento.nome_equipamento, h.status_anterior, h.status_novo)
+            for h in db.query(models.HistoricoStatus)
+        ],
+    }
+
+
+def test_envio_para_central_e_reenvio_sem_duplicar(estacao, central):
+    checklist = _salvar_checklist(estacao)
+    _mudar_status(estacao, "Torre 01", "Parado")
+    enviar = sincronizacao.transporte_direto(central)
+
+    primeiro = sincronizacao.enviar_pendentes(estacao, enviar, "central")
+    assert primeiro["aplicados"] > 0
+    with central() as db_central:
+        assert _conteudo(db_central) == _conteudo(estacao)
+
+    segundo = sincronizacao.enviar_pendentes(estacao, enviar, "central")
+    assert segundo["lotes"] == 0 and segundo["aplicados"] == 0
+
+    # Alteração depois do envio atualiza a mesma linha na central
+    registro = estacao.query(models.ItemRegistro).filter_by(checklist_id=checklist.id, valor_registrado=7.5).one()
+    registro.valor_registrado = 8.0
+    estacao.commit()
+    assert sincronizacao.enviar_pendentes(estacao, enviar, "central")["aplicados"] == 1
+    with central() as db_central:
+        assert db_central.query(models.Checklist).count() == 1
+        assert _conteudo(db_central) == _conteudo(estacao)
+
+
+def test_lote_repetido_nao_e_aplicado_de_novo(estacao, central):
+    _salvar_checklist(estacao)
+    dados = sincronizacao.compactar(sincronizacao.montar_lote(estacao, 0))
+
+    with central() as db_central:
+        assert sincronizacao.aplicar_lote(db_central, dados)["aplicados"] > 0
+        repetido = sincronizacao.aplicar_lote(db_central, dados)
+        assert repetido["repetido"] and repetido["aplicados"] == 0
+        assert db_central.query(models.ItemRegistro).count() == 2
+
+
+def test_arquivamento_espera_o_envio_para_a_central(estacao, central):
+    checklist = _salvar_checklist(estacao, quando=datetime.now() - timedelta(days=400))
+
+    assert arquivo.arquivar_antigos(estacao, dias=30)["checklists"] == 0
+    assert estacao.query(models.ItemRegistro).filter_by(checklist_id=checklist.id).count() == 2
+
+    sincronizacao.enviar_pendentes(estacao, sincronizacao.transporte_direto(central), "central")
+    assert arquivo.arquivar_antigos(estacao, dias=30)["checklists"] == 1
+    with central() as db_central:
+        assert db_central.query(models.ItemRegistro).count() == 2
+
+
+def _equipamento_na_central(central, status, quando):
+    with central() as db_central:
+        db_central.add(models.StatusEquipamento(nome_equipamento="Torre 01", tipo="Torre", status=status,
+                                                tecnico="Bruno", data_atualizacao=quando))
+        db_central.commit()
+
+
+def _status_na_central(central):
+    with central() as db_central:
+        equipamento = db_central.query(models.StatusEquipamento).filter_by(nome_equipamento="Torre 01").one()
+        return equipamento.status, equipamento.tecnico, equipamento.data_atualizacao
+
+
+def test_central_mais_nova_mantem_o_status_e_avisa_o_conflito(estacao, central):
+    _equipamento_na_central(central, "Manutenção", datetime(2024, 5, 1, 9))
+    _mudar_status(estacao, "Torre 01", "Parado")            # 08:00 na estação
+
+    resumo = sincronizacao.enviar_pendentes(estacao, sincronizacao.transporte_direto(central), "central")
+
+    assert _status_na_central(central) == ("Manutenção", "Bruno", datetime(2024, 5, 1, 9))
+    assert resumo["conflitos"] == [{
+        "equipamento": "Torre 01",
+        "central": {"status": "Manutenção", "data": "2024-05-01T09:00:00"},
+        "estacao": {"status": "Parado", "data": "2024-05-01T08:00:00"},
+        "mantido": "central",
+    }]
+
+
+def test_central_mais_antiga_recebe_o_status_da_estacao(estacao, central):
+    _equipamento_na_central(central, "OK", datetime(2024, 5, 1, 7))
+    _mudar_status(estacao, "Torre 01", "Parado")            # 08:00 na estação
+
+    resumo = sincronizacao.enviar_pendentes(estacao, sincronizacao.transporte_direto(central), "central")
+
+    assert resumo["conflitos"] == []
+    status, _, data = _status_na_central(central)
+    assert (status, data) == ("Parado", datetime(2024, 5, 1, 8))
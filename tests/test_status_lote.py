@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import models
+
+
+def _equipamentos(db, *nomes):
+    equipamentos = [
+        models.StatusEquipamento(nome_equipamento=nome, tipo="Torre", status="OK",
+                                 data_atualizacao=datetime(2024, 5, 1, 7))
+        for nome in nomes
+    ]
+    db.add_all(equipamentos)
+    db.commit()
+    return [e.id for e in equipamentos]
+
+
+def _alteracao(equipamento_id, anterior="OK", novo="Parado"):
+    return {"equipamento_id": equipamento_id, "status_anterior": anterior, "status_novo": novo,
+            "observacao": "Troca de rolamento", "tecnico": "Ana"}
+
+
+def _estado(db):
+    db.expire_all()
+    return {
+        "status": {e.id: e.status for e in db.query(models.StatusEquipamento)},
+        "historicos": db.query(models.HistoricoStatus).count(),
+    }
+
+
+def test_lote_atualiza_status_e_historico_juntos(db, cliente):
+    torre, chiller = _equipamentos(db, "Torre 01", "Chiller 01")
+
+    resposta = cliente.post("/atualizar_status_lote", json={"alteracoes": [
+        _alteracao(torre), _alteracao(chiller, novo="Manutenção"),
+    ]})
+
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["ok"] and [a["equipamento_id"] for a in corpo["atualizados"]] == [torre, chiller]
+    assert _estado(db) == {"status": {torre: "Parado", chiller: "Manutenção"}, "historicos": 2}
+    historico = db.query(models.HistoricoStatus).filter_by(equipamento_id=chiller).one()
+    assert (historico.status_anterior, historico.status_novo, historico.tecnico) == ("OK", "Manutenção", "Ana")
+
+
+def test_status_anterior_desatualizado_devolve_409_sem_gravar(db, cliente):
+    torre, chiller = _equipamentos(db, "Torre 01", "Chiller 01")
+    db.get(models.StatusEquipamento, chiller).status = "Parado"      # outro usuário mudou antes
+    db.commit()
+
+    resposta = cliente.post("/atualizar_status_lote", json={"alteracoes": [
+        _alteracao(torre), _alteracao(chiller, novo="Manutenção"),
+    ]})
+
+    assert resposta.status_code == 409
+    assert resposta.json()["conflitos"] == [{
+        "equipamento_id": chiller, "motivo": "status alterado por outro usuário",
+        "status_esperado": "OK", "status_atual": "Parado",
+    }]
+    assert _estado(db) == {"status": {torre: "OK", chiller: "Parado"}, "historicos": 0}
+
+
+def test_equipamento_repetido_devolve_400(db, cliente):
+    torre, = _equipamentos(db, "Torre 01")
+
+    resposta = cliente.post("/atualizar_status_lote", json={"alteracoes": [
+        _alteracao(torre), _alteracao(torre, novo="Manutenção"),
+    ]})
+
+    assert resposta.status_code == 400
+    assert resposta.json()["ok"] is False
+    assert _estado(db) == {"status": {torre: "OK"}, "historicos": 0}
+
+
+def test_equipamento_inexistente_rejeita_o_lote(db, cliente):
+    torre, = _equipamentos(db, "Torre 01")
+
+    resposta = cliente.post("/atualizar_status_lote", json={"alteracoes": [
+        _alteracao(torre), _alteracao(torre + 100),
+    ]})
+
+    assert resposta.status_code == 409
+    assert resposta.json()["conflitos"] == [{"equipamento_id": torre + 100, "motivo": "não encontrado"}]
+    assert _estado(db) == {"status": {torre: "OK"}, "historicos": 0}